@@ -0,0 +1,103 @@
+"""Vectorized report statistics using NumPy.
+NumPy is optional. numpy_available() reports if it could be imported and
+task_manager.py falls back to its pure Python get_report_data if not.
+python3 task_manager.py --analytics numpy selects this engine.
+"""
+
+from array import array
+from datetime import date
+
+from task_store import PersistentList
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the arrays of the last task_list. a task_list is never changed in place so
+# the same object always has the same arrays.
+_arrays_cache = {"task_list": None, "arrays": None}
+
+
+def numpy_available():
+    """
+    returns: boolean - True if NumPy could be imported.
+    """
+    return np is not None
+
+
+def load_task_arrays(task_list):
+    """
+    loads the task data into NumPy arrays in a single pass.
+    param: task_list - list or iterable of task objects.
+    returns: dict of
+             "usernames" - list of usernames, the index is the user code.
+             "user" - user code of each task.
+             "due" - due date ordinal of each task.
+             "assigned" - assigned date ordinal of each task.
+             "completed" - completed mask.
+    """
+    if task_list is _arrays_cache["task_list"]:
+        return _arrays_cache["arrays"]
+    user_codes = {}
+    user_col = array("i")
+    due_col = array("i")
+    assigned_col = array("i")
+    completed_col = bytearray()
+    for task in task_list:
+        code = user_codes.get(task.username)
+        if code is None:
+            code = user_codes[task.username] = len(user_codes)
+        user_col.append(code)
+        due_col.append(task.due_ordinal)
+        assigned_col.append(task.assigned_ordinal)
+        completed_col.append(task.completed)
+    arrays = {
+        "usernames": list(user_codes),
+        "user": np.frombuffer(user_col, dtype=np.intc),
+        "due": np.frombuffer(due_col, dtype=np.intc),
+        "assigned": np.frombuffer(assigned_col, dtype=np.intc),
+        "completed": np.frombuffer(bytes(completed_col), dtype=np.bool_),
+    }
+    # an iterator can't be read twice so its arrays are not kept
+    if isinstance(task_list, (list, PersistentList)):
+        _arrays_cache["task_list"] = task_list
+        _arrays_cache["arrays"] = arrays
+    return arrays
+
+
+def get_report_data(task_list, user_list):
+    """
+    calculates the same statistics as task_manager.get_report_data with vectorized
+    operations. the per user counts are grouped with bincount.
+    param: task_list - list or iterable of task objects.
+    param: user_list - dict of user objects keyed by username.
+    returns: (all_task_data, user_task_data).
+             all_task_data - [num_tasks, num_completed, num_incomplete, num_overdue].
+             user_task_data - dict of username to [num_tasks, num_completed, num_incomplete, num_overdue].
+    """
+    arrays = load_task_arrays(task_list)
+    num_codes = len(arrays["usernames"])
+    user = arrays["user"]
+    completed = arrays["completed"]
+    overdue = ~completed & (arrays["due"] < date.today().toordinal())
+
+    num_tasks = np.bincount(user, minlength=num_codes)
+    num_completed = np.bincount(user[completed], minlength=num_codes)
+    num_overdue = np.bincount(user[overdue], minlength=num_codes)
+
+    total = len(user)
+    total_completed = int(np.count_nonzero(completed))
+    all_task_data = [
+        total,
+        total_completed,
+        total - total_completed,
+        int(np.count_nonzero(overdue)),
+    ]
+    user_task_data = {username: [0, 0, 0, 0] for username in user_list}
+    for code, username in enumerate(arrays["usernames"]):
+        if username in user_task_data:
+            tasks = int(num_tasks[code])
+            done = int(num_completed[code])
+            user_task_data[username] = [tasks, done, tasks - done, int(num_overdue[code])]
+    return all_task_data, user_task_data
@@ -0,0 +1,321 @@
+"""Non-interactive batch mode for bulk imports and scripted task changes.
+python3 batch.py --users users.csv --tasks tasks.jsonl --ops ops.csv
+Each file can be CSV with a header row or JSONL with one object per line:
+    users - username, password
+    tasks - username, title, description, due_date (YYYY-MM-DD)
+    ops   - op and its fields, applied in order:
+            complete    - task
+            reassign    - task, username
+            redate      - task, due_date
+            delete_user - username
+task is the index of the task in tasks.txt, counting from 0. tasks added by the
+same batch follow on from the existing tasks.
+Records are checked with the same rules as the prompts in task_manager.py. An
+invalid record is reported and skipped. Everything is applied in memory and
+saved once at the end. --storage sqlite uses tasks.db.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+
+from task_manager import (
+    INVALID_DATE_FORMAT,
+    STORAGE_BACKENDS,
+    get_change_type,
+    populate_task_list,
+    populate_user_list,
+    validate_due_date,
+    validate_text,
+    validate_user,
+)
+from task_store import Task, parse_date_ordinal, pool_text
+
+
+class BatchError(Exception):
+    """a record that cannot be applied."""
+
+
+def read_records(path):
+    """
+    reads the records of a CSV or JSONL file.
+    param: path - a .csv or .jsonl file.
+    returns: a generator of (line number, dict of field to value or None if the line
+             is not a JSON object).
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        elif path.endswith(".jsonl"):
+            for line_num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_num, record if isinstance(record, dict) else None
+        else:
+            raise BatchError(f"{path} is not a .csv or .jsonl file")
+
+
+def get_field(record, name):
+    """
+    param: record - dict of field to value.
+    param: name - the field name.
+    returns: the field as a stripped string.
+    """
+    value = record.get(name)
+    if value is None or value == "":
+        raise BatchError(f"{name} is missing")
+    value = str(value).strip()
+    # every field is stored in the same records as the titles and descriptions
+    if validate_text(value) is not None:
+        raise BatchError(f"{name} must not contain ; or line breaks")
+    return value
+
+
+def get_due_ordinal(record, today):
+    """
+    param: record - dict of field to value.
+    param: today - today's date.
+    returns: the ordinal of a valid due date.
+    """
+    try:
+        due_ordinal = parse_date_ordinal(get_field(record, "due_date"))
+    except ValueError:
+        raise BatchError(INVALID_DATE_FORMAT) from None
+    error = validate_due_date(datetime.fromordinal(due_ordinal), today)
+    if error is not None:
+        raise BatchError(error)
+    return due_ordinal
+
+
+def get_username(record, user_list, should_exist=True):
+    """
+    param: record - dict of field to value.
+    param: user_list - dict of user objects keyed by username.
+    param: should_exist - see validate_user.
+    returns: the valid, lower case username.
+    """
+    username = get_field(record, "username").lower()
+    error = validate_user(username, user_list, should_exist)
+    if error is not None:
+        raise BatchError(error)
+    return username
+
+
+def get_open_task(record, task_list):
+    """
+    param: record - dict of field to value.
+    param: task_list - list of task objects.
+    returns: (index, task) of an uncompleted task. only these can be edited with vm.
+    """
+    try:
+        idx = int(get_field(record, "task"))
+    except ValueError:
+        raise BatchError("task must be a task index") from None
+    if not 0 <= idx < len(task_list):
+        raise BatchError(f"There is no task {idx}")
+    if task_list[idx].completed:
+        raise BatchError(f"Task {idx} is already completed")
+    return idx, task_list[idx]
+
+
+def add_user(batch, record):
+    username = get_username(record, batch["user_list"], False)
+    password = get_field(record, "password")
+    # the user_list is only used by the batch so it is updated in place
+    batch["user_list"][username] = {"username": username, "password": password}
+    batch["save_users"] = True
+
+
+def add_task(batch, record):
+    new_task = Task(
+        sys.intern(get_username(record, batch["user_list"])),
+        pool_text(get_field(record, "title")),
+        pool_text(get_field(record, "description")),
+        get_due_ordinal(record, batch["today"]),
+        batch["today"].toordinal(),
+        False,
+    )
+    set_task(batch, len(batch["task_list"]), None, new_task)
+
+
+def complete_task(batch, record):
+    idx, task = get_open_task(record, batch["task_list"])
+    task_copy = task.copy()
+    task_copy.completed = True
+    set_task(batch, idx, task, task_copy)
+
+
+def reassign_task(batch, record):
+    idx, task = get_open_task(record, batch["task_list"])
+    task_copy = task.copy()
+    task_copy.username = get_username(record, batch["user_list"])
+    set_task(batch, idx, task, task_copy)
+
+
+def redate_task(batch, record):
+    idx, task = get_open_task(record, batch["task_list"])
+    task_copy = task.copy()
+    task_copy.due_ordinal = get_due_ordinal(record, batch["today"])
+    set_task(batch, idx, task, task_copy)
+
+
+def delete_user(batch, record):
+    username = get_username(record, batch["user_list"])
+    if username == "admin":
+        raise BatchError("admin cannot be deleted")
+    # the same rule as delete_user, a user with uncompleted tasks is kept
+    if batch["open_tasks"].get(username, 0):
+        raise BatchError("This user has tasks assign, cannot delete")
+    del batch["user_list"][username]
+    batch["save_users"] = True
+
+
+def set_task(batch, idx, old_task, new_task):
+    """
+    replaces or appends a task and records the change.
+    param: batch - the batch state.
+    param: idx - the task index, len(task_list) to append.
+    param: old_task - the task being replaced or None.
+    param: new_task - the new task.
+    """
+    if old_task is None:
+        batch["task_list"] = batch["task_list"].append(new_task)
+    else:
+        batch["task_list"] = batch["task_list"].set(idx, new_task)
+        count_open_task(batch, old_task, -1)
+    count_open_task(batch, new_task, 1)
+    # task_changes is only used by the batch so it is updated in place
+    task_changes = batch["task_changes"]
+    task_changes[idx] = get_change_type(task_changes.get(idx), old_task, new_task)
+
+
+def count_open_task(batch, task, step):
+    if not task.completed:
+        open_tasks = batch["open_tasks"]
+        open_tasks[task.username] = open_tasks.get(task.username, 0) + step
+
+
+OPERATIONS = {
+    "complete": complete_task,
+    "reassign": reassign_task,
+    "redate": redate_task,
+    "delete_user": delete_user,
+}
+
+
+def apply_records(batch, path, apply_cb):
+    """
+    applies every record of a file, reporting and skipping the invalid ones.
+    param: batch - the batch state, updated in place.
+    param: path - the CSV or JSONL file.
+    param: apply_cb - function which consumes the batch and a record.
+    returns: the number of records applied.
+    """
+    applied = 0
+    try:
+        for line_num, record in read_records(path):
+            try:
+                if record is None:
+                    raise BatchError("not a JSON object")
+                apply_cb(batch, record)
+                applied += 1
+            except BatchError as e:
+                batch["errors"].append(f"{path}:{line_num}: {e}")
+    except (OSError, csv.Error, BatchError) as e:
+        batch["errors"].append(f"{path}: {e}")
+    return applied
+
+
+def apply_operation(batch, record):
+    operation = OPERATIONS.get(str(record.get("op", "")).strip().lower())
+    if operation is None:
+        raise BatchError(f"op must be one of {', '.join(OPERATIONS)}")
+    operation(batch, record)
+
+
+def save_batch(batch, storage):
+    """
+    saves the users and tasks once.
+    many changes rewrite the stored tasks, a few are appended to the journal. the
+    journal is also used if the tasks can't be rewritten, e.g. another process has
+    changed them.
+    param: batch - the batch state.
+    param: storage - the storage backend module.
+    returns: boolean - True if everything was saved.
+    """
+    users_saved = tasks_saved = True
+    if batch["save_users"]:
+        users_saved = storage.write_users_file(batch["user_list"])
+    task_changes = batch["task_changes"]
+    if task_changes:
+        tasks_saved = False
+        if len(task_changes) * 2 >= len(batch["task_list"]):
+            tasks_saved = storage.compact_tasks_file(batch["task_list"])
+        if not tasks_saved:
+            tasks_saved = storage.append_tasks_journal(
+                batch["task_list"], task_changes, batch["saved_task_list"]
+            )
+    return users_saved and tasks_saved
+
+
+def main(argv):
+    """
+    param: argv - the command line arguments.
+    returns: the exit status, 1 if any record was skipped or not saved.
+    """
+    parser = argparse.ArgumentParser(
+        description="Bulk imports and scripted changes for DO-IT-NOW!"
+    )
+    parser.add_argument("--users", help="CSV or JSONL file of users to register")
+    parser.add_argument("--tasks", help="CSV or JSONL file of tasks to add")
+    parser.add_argument("--ops", help="CSV or JSONL file of operations to apply")
+    parser.add_argument("--storage", choices=STORAGE_BACKENDS, default="files")
+    args = parser.parse_args(argv)
+    storage = STORAGE_BACKENDS[args.storage]
+
+    task_list = populate_task_list(storage.read_tasks_file, storage.read_tasks_journal)
+    batch = {
+        "user_list": populate_user_list(storage.read_users_file),
+        "task_list": task_list,
+        # the task_list as loaded, which the stored records are checked against
+        "saved_task_list": task_list,
+        "task_changes": {},
+        "save_users": False,
+        "today": datetime.today(),
+        # uncompleted tasks of each user, for delete_user
+        "open_tasks": {},
+        "errors": [],
+    }
+    for task in task_list:
+        count_open_task(batch, task, 1)
+
+    counts = {}
+    for name, path, apply_cb in (
+        ("users", args.users, add_user),
+        ("tasks", args.tasks, add_task),
+        ("operations", args.ops, apply_operation),
+    ):
+        if path:
+            counts[name] = apply_records(batch, path, apply_cb)
+    saved = save_batch(batch, storage)
+
+    for error in batch["errors"]:
+        print(error)
+    summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+    print(f"Applied {summary or 'nothing'}. {len(batch['errors'])} records skipped")
+    if not saved:
+        print("Some changes could not be saved")
+        return 1
+    return 1 if batch["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,10 @@
+"""Benchmarks for the task manager at scale.
+dataset.py - deterministic generator for users.txt and tasks.txt.
+suite.py - timing and memory benchmarks with JSON results.
+memory.py - memory saved by sharing the strings of recurring tasks.
+python3 -m benchmarks generate --tasks 100000 --users 1000 - writes a dataset.
+python3 -m benchmarks run --tasks 1000 100000 --users 10 1000 --output results.json
+python3 -m benchmarks compare old.json new.json - reports regressions between runs.
+python3 -m benchmarks memory --tasks 100000 --users 1000 - the memory report.
+Run from the repository folder.
+"""
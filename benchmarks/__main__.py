@@ -0,0 +1,74 @@
+"""Command line for the benchmarks, see benchmarks/__init__.py."""
+
+import argparse
+import sys
+
+from benchmarks.dataset import get_dataset
+from benchmarks.memory import format_report, memory_report
+from benchmarks.suite import compare_results, run_suite, write_results
+
+
+def main(argv):
+    """
+    param: argv - the command line arguments.
+    returns: the exit status.
+    """
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("generate", "run"):
+        command = commands.add_parser(name)
+        command.add_argument("--tasks", type=int, nargs="+", default=[1000, 100_000])
+        command.add_argument("--users", type=int, nargs="+", default=[10, 1000])
+        command.add_argument(
+            "--skew", type=float, default=1.0, help="0 assigns tasks to users evenly"
+        )
+        command.add_argument("--seed", type=int, default=0)
+    run = commands.choices["run"]
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    run.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    run.add_argument("--output", help="JSON file for the results")
+
+    compare = commands.add_parser("compare")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument(
+        "--threshold", type=float, default=1.1, help="slowdown ratio counted as a regression"
+    )
+
+    memory = commands.add_parser("memory")
+    memory.add_argument("--tasks", type=int, nargs="+", default=[100_000])
+    memory.add_argument("--users", type=int, nargs="+", default=[1000])
+    memory.add_argument(
+        "--skew", type=float, default=1.2, help="how much the users and texts recur"
+    )
+    memory.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return 1 if compare_results(args.old, args.new, args.threshold) else 0
+
+    sizes = [(num_tasks, num_users) for num_tasks in args.tasks for num_users in args.users]
+    if args.command == "generate":
+        for num_tasks, num_users in sizes:
+            print(get_dataset(num_tasks, num_users, args.skew, args.seed))
+        return 0
+    if args.command == "memory":
+        reports = [
+            memory_report(num_tasks, num_users, args.skew, args.seed)
+            for num_tasks, num_users in sizes
+        ]
+        for report in reports:
+            print(format_report(report))
+        return 0 if all(report["identical"] for report in reports) else 1
+    document = run_suite(
+        sizes, args.skew, args.seed, args.repeat, not args.no_memory, args.only
+    )
+    if args.output:
+        write_results(document, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,127 @@
+"""Deterministic generator for benchmark datasets.
+The same size, skew and seed always produce byte-identical users.txt and
+tasks.txt files, in the format file_access reads. Uncompleted tasks are
+written as "No" like older files, file_access pads it to "No " when it writes.
+"""
+
+import os
+import random
+import tempfile
+from datetime import date
+from itertools import accumulate
+
+DATETIME_STRING_FORMAT = "%Y-%m-%d"
+
+# dates are fixed so a dataset never changes, today decides which tasks are overdue
+BASE_DATE = date(2024, 1, 1).toordinal()
+ASSIGNED_DAYS = 365
+DUE_DAYS = 3 * 365
+
+COMPLETED_RATIO = 0.3
+
+WORDS = (
+    "report meeting review budget client design update plan deploy test "
+    "invoice audit draft schedule release backup survey training order call"
+).split()
+
+# lines are written in chunks so a 10M task file is never held in memory
+CHUNK_SIZE = 100_000
+
+DATA_DIR = os.path.join(tempfile.gettempdir(), "task_manager_bench")
+
+
+def dataset_name(num_tasks, num_users, skew, seed):
+    """
+    param: num_tasks, num_users, skew, seed - the dataset parameters.
+    returns: the folder name of the dataset.
+    """
+    return f"tasks{num_tasks}_users{num_users}_skew{skew:g}_seed{seed}"
+
+
+def get_usernames(num_users):
+    """
+    param: num_users - the number of users, including admin.
+    returns: list of usernames, admin first.
+    """
+    width = len(str(num_users))
+    return ["admin"] + [f"user{n:0{width}}" for n in range(1, num_users)]
+
+
+def get_user_weights(num_users, skew):
+    """
+    zipf-like weights so a few users are assigned most of the tasks.
+    param: num_users - the number of users.
+    param: skew - 0 assigns tasks evenly, larger values favour the first users.
+    returns: list of cumulative weights for random.choices.
+    """
+    return list(accumulate(1 / rank**skew for rank in range(1, num_users + 1)))
+
+
+def format_date(ordinal):
+    return date.fromordinal(ordinal).strftime(DATETIME_STRING_FORMAT)
+
+
+def generate_task_lines(num_tasks, num_users, skew, seed):
+    """
+    generates tasks.txt records in chunks.
+    param: num_tasks - the number of tasks.
+    param: num_users - the number of users tasks are assigned to.
+    param: skew - see get_user_weights.
+    param: seed - the random seed.
+    returns: a generator of lists of task records.
+    """
+    rnd = random.Random(seed)
+    usernames = get_usernames(num_users)
+    cum_weights = get_user_weights(num_users, skew)
+    dates = [format_date(BASE_DATE + d) for d in range(-ASSIGNED_DAYS, DUE_DAYS)]
+    for chunk_start in range(0, num_tasks, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, num_tasks - chunk_start)
+        assignees = rnd.choices(usernames, cum_weights=cum_weights, k=size)
+        lines = []
+        for n, username in enumerate(assignees, start=chunk_start + 1):
+            assigned = rnd.randrange(ASSIGNED_DAYS)
+            due = assigned + rnd.randrange(1, DUE_DAYS)
+            title = f"{rnd.choice(WORDS).capitalize()} {n}"
+            description = " ".join(rnd.choices(WORDS, k=rnd.randrange(3, 12)))
+            completed = "Yes" if rnd.random() < COMPLETED_RATIO else "No"
+            lines.append(
+                f"{username};{title};{description};{dates[due]};{dates[assigned]};{completed}"
+            )
+        yield lines
+
+
+def write_dataset(path, num_tasks, num_users, skew=1.0, seed=0):
+    """
+    writes txt_files/users.txt and txt_files/tasks.txt in a folder.
+    param: path - the dataset folder.
+    param: num_tasks - the number of tasks.
+    param: num_users - the number of users, including admin.
+    param: skew - see get_user_weights.
+    param: seed - the random seed.
+    """
+    txt_path = os.path.join(path, "txt_files")
+    os.makedirs(txt_path, exist_ok=True)
+    with open(os.path.join(txt_path, "users.txt"), "w") as f:
+        f.write("\n".join(f"{username};pw" for username in get_usernames(num_users)))
+    # tasks.txt only appears once it is complete, see get_dataset
+    tasks_path = os.path.join(txt_path, "tasks.txt")
+    with open(tasks_path + ".tmp", "w") as f:
+        # like write_tasks_file there is no newline after the last task
+        separator = ""
+        for lines in generate_task_lines(num_tasks, num_users, skew, seed):
+            f.write(separator + "\n".join(lines))
+            separator = "\n"
+    os.replace(tasks_path + ".tmp", tasks_path)
+
+
+def get_dataset(num_tasks, num_users, skew=1.0, seed=0, data_dir=DATA_DIR):
+    """
+    returns the folder of a dataset, generating it the first time.
+    param: num_tasks, num_users, skew, seed - see write_dataset.
+    param: data_dir - the folder the datasets are kept in.
+    returns: the dataset folder.
+    """
+    path = os.path.join(data_dir, dataset_name(num_tasks, num_users, skew, seed))
+    if not os.path.exists(os.path.join(path, "txt_files", "tasks.txt")):
+        write_dataset(path, num_tasks, num_users, skew, seed)
+    return path
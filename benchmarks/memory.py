@@ -0,0 +1,164 @@
+"""Memory report for the pooled usernames, titles and descriptions.
+python3 -m benchmarks memory --tasks 100000 --users 1000 --skew 1.2
+The tasks of the report recur like a real team's, a few titles and descriptions
+such as "Weekly report" are shared by many tasks and the rest by a few, with the
+same zipf-like skew as the users. Each dataset is loaded with populate_task_list
+and with a loader that gives every task its own strings, as before the pool, and
+the memory held by each task_list is compared. Both are written back with
+write_tasks_file to check the pool leaves the output byte for byte the same.
+"""
+
+import os
+import random
+import tempfile
+
+import file_access
+from task_manager import populate_task_list
+from task_store import PersistentList, Task, parse_date_ordinal, text_pool
+
+from benchmarks.dataset import (
+    ASSIGNED_DAYS,
+    BASE_DATE,
+    COMPLETED_RATIO,
+    DUE_DAYS,
+    WORDS,
+    format_date,
+    get_user_weights,
+    get_usernames,
+)
+from benchmarks.suite import measure_memory, working_directory
+
+# distinct titles and descriptions to choose from, ranked from the most used
+NUM_TITLES = 2000
+NUM_DESCRIPTIONS = 5000
+
+
+def get_texts(rnd, count, min_words, max_words):
+    """
+    param: rnd - the random generator.
+    param: count - the number of texts.
+    param: min_words, max_words - the range of words in each text.
+    returns: list of distinct texts.
+    """
+    texts = {}
+    while len(texts) < count:
+        words = rnd.choices(WORDS, k=rnd.randint(min_words, max_words))
+        words[0] = words[0].capitalize()
+        texts[" ".join(words)] = None
+    return list(texts)
+
+
+def write_recurring_dataset(path, num_tasks, num_users, skew, seed):
+    """
+    writes txt_files/users.txt and txt_files/tasks.txt with recurring texts.
+    param: path - the dataset folder.
+    param: num_tasks, num_users, skew, seed - see benchmarks.dataset.write_dataset.
+    """
+    rnd = random.Random(seed)
+    usernames = get_usernames(num_users)
+    titles = get_texts(rnd, NUM_TITLES, 2, 3)
+    descriptions = get_texts(rnd, NUM_DESCRIPTIONS, 3, 11)
+    dates = [format_date(BASE_DATE + d) for d in range(-ASSIGNED_DAYS, DUE_DAYS)]
+    txt_path = os.path.join(path, "txt_files")
+    os.makedirs(txt_path, exist_ok=True)
+    with open(os.path.join(txt_path, "users.txt"), "w") as f:
+        f.write("\n".join(f"{username};pw" for username in usernames))
+    lines = []
+    for username, title, description in zip(
+        rnd.choices(usernames, cum_weights=get_user_weights(num_users, skew), k=num_tasks),
+        rnd.choices(titles, cum_weights=get_user_weights(NUM_TITLES, skew), k=num_tasks),
+        rnd.choices(
+            descriptions,
+            cum_weights=get_user_weights(NUM_DESCRIPTIONS, skew),
+            k=num_tasks,
+        ),
+    ):
+        assigned = rnd.randrange(ASSIGNED_DAYS)
+        due = assigned + rnd.randrange(1, DUE_DAYS)
+        completed = "Yes" if rnd.random() < COMPLETED_RATIO else "No"
+        lines.append(
+            f"{username};{title};{description};{dates[due]};{dates[assigned]};{completed}"
+        )
+    with open(os.path.join(txt_path, "tasks.txt"), "w") as f:
+        f.write("\n".join(lines))
+
+
+def load_unpooled_tasks():
+    """
+    loads tasks.txt giving every task its own username, title and description.
+    returns: a PersistentList of task objects.
+    """
+
+    def parse(t_str):
+        username, title, description, due_date, assigned_date, completed = (
+            t_str.rstrip("\n").split(";")
+        )
+        return Task(
+            username,
+            title,
+            description,
+            parse_date_ordinal(due_date),
+            parse_date_ordinal(assigned_date),
+            completed == "Yes",
+        )
+
+    with open(file_access.TASKS_PATH) as f:
+        return PersistentList.from_iterable(map(parse, f))
+
+
+def load_pooled_tasks():
+    """
+    loads tasks.txt with populate_task_list, starting from an empty pool.
+    returns: a PersistentList of task objects.
+    """
+    text_pool.clear()
+    return populate_task_list(file_access.read_tasks_file, file_access.read_tasks_journal)
+
+
+def written_tasks(task_list):
+    """
+    param: task_list - list of task objects.
+    returns: the bytes write_tasks_file writes for the tasks.
+    """
+    file_access.write_tasks_file(task_list)
+    with open(file_access.TASKS_PATH, "rb") as f:
+        return f.read()
+
+
+def memory_report(num_tasks, num_users, skew=1.2, seed=0):
+    """
+    loads a recurring dataset with and without the pool.
+    param: num_tasks, num_users, skew, seed - the dataset parameters.
+    returns: dict of the dataset, the bytes held by each task_list and whether
+             write_tasks_file wrote the same bytes for both.
+    """
+    with tempfile.TemporaryDirectory() as path:
+        write_recurring_dataset(path, num_tasks, num_users, skew, seed)
+        with working_directory(path):
+            unpooled = measure_memory(load_unpooled_tasks)[1]
+            pooled = measure_memory(load_pooled_tasks)[1]
+            # both are loaded before either is written over tasks.txt
+            task_lists = load_unpooled_tasks(), load_pooled_tasks()
+            identical = written_tasks(task_lists[0]) == written_tasks(task_lists[1])
+    return {
+        "dataset": {"tasks": num_tasks, "users": num_users, "skew": skew, "seed": seed},
+        "unpooled_memory": unpooled,
+        "pooled_memory": pooled,
+        "identical": identical,
+    }
+
+
+def format_report(report):
+    """
+    param: report - a report from memory_report.
+    returns: one line summary of the report.
+    """
+    dataset = report["dataset"]
+    unpooled = report["unpooled_memory"] / 2**20
+    pooled = report["pooled_memory"] / 2**20
+    return (
+        f"{dataset['tasks']:>9} tasks {dataset['users']:>7} users  "
+        f"unpooled {unpooled:9.2f} MiB  pooled {pooled:9.2f} MiB  "
+        f"saved {1 - pooled / unpooled:6.1%}  "
+        f"output {'identical' if report['identical'] else 'DIFFERENT'}"
+    )
@@ -0,0 +1,269 @@
+"""Timing and memory benchmarks for the task manager functions.
+Each benchmark runs in the dataset folder because file_access uses paths
+relative to the working directory. The times are wall clock seconds from
+repeated runs and the memory is the tracemalloc peak of a separate run.
+first_prompt starts task_manager.py on a copy of the dataset and times how long
+the first prompt takes to appear, which should not grow with the dataset.
+"""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+import file_access
+from task_manager import (
+    filter_user_tasks,
+    gen_reports,
+    get_task_data,
+    populate_task_list,
+    populate_user_list,
+)
+
+from benchmarks.dataset import get_dataset
+
+FIRST_PROMPT = b"Enter 'l' to login"
+TASK_MANAGER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "task_manager.py"
+)
+
+
+@contextmanager
+def working_directory(path):
+    old_path = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old_path)
+
+
+def load_tasks():
+    return populate_task_list(file_access.read_tasks_file, file_access.read_tasks_journal)
+
+
+def load_users():
+    return populate_user_list(file_access.read_users_file)
+
+
+def write_tasks_copy(task_list, path):
+    with working_directory(path):
+        file_access.write_tasks_file(task_list)
+
+
+def get_benchmarks(task_list, user_list, scratch_path):
+    """
+    creates the benchmarked calls for a loaded dataset.
+    write_tasks_file writes to a copy in scratch_path, its output differs from the
+    generated tasks.txt, so writing over the dataset would change the next runs.
+    param: task_list - the loaded tasks.
+    param: user_list - the loaded users.
+    param: scratch_path - a folder holding an empty txt_files folder.
+    returns: dict of function name to a function without arguments.
+    """
+    # the generator assigns the most tasks to the first user
+    busiest_user = next(iter(user_list), "admin")
+    return {
+        "populate_task_list": load_tasks,
+        "populate_user_list": load_users,
+        "filter_user_tasks": lambda: filter_user_tasks(task_list, busiest_user),
+        "get_task_data": lambda: get_task_data(task_list),
+        "gen_reports": lambda: gen_reports(task_list, user_list),
+        "write_tasks_file": lambda: write_tasks_copy(task_list, scratch_path),
+    }
+
+
+def time_call(func, repeat):
+    """
+    param: func - the function to time.
+    param: repeat - the number of runs.
+    returns: list of wall clock seconds of each run.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def time_first_prompt(path):
+    """
+    starts task_manager.py and times how long the first prompt takes to appear,
+    including the Python startup. the program is then told to exit.
+    param: path - the folder holding the txt_files folder to run in.
+    returns: the wall clock seconds until the first prompt.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, TASK_MANAGER_PATH],
+        cwd=path,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    output = b""
+    while FIRST_PROMPT not in output:
+        data = process.stdout.read1()
+        if not data:
+            raise RuntimeError("task_manager.py exited before the first prompt")
+        output += data
+    seconds = time.perf_counter() - start
+    # exiting waits for the setup to finish so the next run starts from a settled copy
+    process.communicate(b"e\n")
+    return seconds
+
+
+def measure_memory(func):
+    """
+    param: func - the function to measure.
+    returns: (peak bytes allocated during the call, bytes still held by its result).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - start, current - start
+
+
+def run_dataset(num_tasks, num_users, skew, seed, repeat=3, memory=True, names=None):
+    """
+    runs every benchmark against one dataset.
+    param: num_tasks, num_users, skew, seed - the dataset parameters.
+    param: repeat - the number of timed runs of each benchmark.
+    param: memory - measure the memory of each benchmark.
+    param: names - optional list of benchmark names to run.
+    returns: list of result dicts.
+    """
+    dataset = {"tasks": num_tasks, "users": num_users, "skew": skew, "seed": seed}
+    results = []
+    with working_directory(get_dataset(num_tasks, num_users, skew, seed)):
+        task_list = load_tasks()
+        user_list = load_users()
+        with tempfile.TemporaryDirectory() as scratch_path:
+            os.mkdir(os.path.join(scratch_path, "txt_files"))
+            benchmarks = get_benchmarks(task_list, user_list, scratch_path)
+            for name, func in benchmarks.items():
+                if names and name not in names:
+                    continue
+                # gen_reports prints its messages
+                with redirect_stdout(StringIO()):
+                    times = time_call(func, repeat)
+                    peak, retained = measure_memory(func) if memory else (None, None)
+                results.append(make_result(dataset, name, times, peak, retained))
+                print(format_result(results[-1]))
+        if not names or "first_prompt" in names:
+            # task_manager.py archives old completed tasks, so it runs on a copy
+            with tempfile.TemporaryDirectory() as path:
+                shutil.copytree("txt_files", os.path.join(path, "txt_files"))
+                times = [time_first_prompt(path) for _ in range(repeat)]
+            results.append(make_result(dataset, "first_prompt", times))
+            print(format_result(results[-1]))
+    return results
+
+
+def make_result(dataset, name, times, peak=None, retained=None):
+    """
+    param: dataset - dict of the dataset parameters.
+    param: name - the benchmark name.
+    param: times - list of wall clock seconds of each run.
+    param: peak, retained - bytes from measure_memory, or None if not measured.
+    returns: the result dict.
+    """
+    times = sorted(times)
+    return {
+        "dataset": dataset,
+        "function": name,
+        "times": times,
+        "min": times[0],
+        "median": times[len(times) // 2],
+        "peak_memory": peak,
+        "retained_memory": retained,
+    }
+
+
+def run_suite(sizes, skew=1.0, seed=0, repeat=3, memory=True, names=None):
+    """
+    param: sizes - list of (num_tasks, num_users).
+    param: skew, seed - the dataset parameters.
+    param: repeat, memory, names - see run_dataset.
+    returns: the results document written by write_results.
+    """
+    results = []
+    for num_tasks, num_users in sizes:
+        results += run_dataset(num_tasks, num_users, skew, seed, repeat, memory, names)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def format_result(result):
+    """
+    param: result - a result dict.
+    returns: one line summary of the result.
+    """
+    dataset = result["dataset"]
+    line = (
+        f"{dataset['tasks']:>9} tasks {dataset['users']:>7} users  "
+        f"{result['function']:<20} median {result['median'] * 1000:10.2f} ms"
+    )
+    if result["peak_memory"] is not None:
+        line += f"  peak {result['peak_memory'] / 2**20:9.2f} MiB"
+    return line
+
+
+def write_results(document, path):
+    """
+    param: document - the results from run_suite.
+    param: path - the JSON file to write.
+    """
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def compare_results(old_path, new_path, threshold=1.1):
+    """
+    compares the median times of two result files.
+    param: old_path - the JSON results of the baseline run.
+    param: new_path - the JSON results of the new run.
+    param: threshold - a new/old ratio above this is a regression.
+    returns: list of (dataset, function, ratio) for every regression.
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(result):
+        return json.dumps(result["dataset"], sort_keys=True), result["function"]
+
+    old_medians = {key(result): result["median"] for result in old["results"]}
+    regressions = []
+    for result in new["results"]:
+        old_median = old_medians.get(key(result))
+        if not old_median:
+            continue
+        ratio = result["median"] / old_median
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{format_result(result)}  x{ratio:.2f} of baseline{flag}")
+        if flag:
+            regressions.append((result["dataset"], result["function"], ratio))
+    return regressions
@@ -0,0 +1,36 @@
+"""Converts the stored tasks between the text and binary formats.
+python3 convert_tasks.py binary - tasks.txt to tasks.bin.
+python3 convert_tasks.py text   - tasks.bin to tasks.txt.
+python3 convert_tasks.py sqlite - imports users.txt and the tasks into tasks.db.
+The program uses whichever file format is present when it starts, and
+tasks.db when started with --storage sqlite.
+"""
+
+import sys
+
+from file_access import convert_tasks_file
+from sqlite_access import migrate_txt_files
+
+
+def main(argv):
+    """
+    param: argv - the command line arguments.
+    returns: the exit status.
+    """
+    if len(argv) != 1 or argv[0] not in ("binary", "text", "sqlite"):
+        print("Usage: python3 convert_tasks.py binary|text|sqlite")
+        return 2
+    if argv[0] == "sqlite":
+        num_users, num_tasks = migrate_txt_files()
+        print(f"Imported {num_users} users and {num_tasks} tasks into tasks.db")
+        return 0
+    to_binary = argv[0] == "binary"
+    if not convert_tasks_file(to_binary):
+        print(f"Tasks are already stored as {argv[0]} or could not be converted")
+        return 1
+    print(f"Tasks converted to {'tasks.bin' if to_binary else 'tasks.txt'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
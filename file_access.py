@@ -1,58 +1,833 @@
+import locale
+import mmap
 import os
+import struct
 import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate, compress
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from task_store import (
+    Task,
+    parse_archived_task,
+    parse_task,
+    replay_journal,
+    text_counts,
+    text_pool,
+)
 
 DATETIME_STRING_FORMAT = "%Y-%m-%d"
 TASKS_PATH = "txt_files/tasks.txt"
+TASKS_BIN_PATH = "txt_files/tasks.bin"
+TASKS_JOURNAL_PATH = "txt_files/tasks_journal.txt"
 USERS_PATH = "txt_files/users.txt"
 TASKS_STATS_PATH = "txt_files/task_overview.txt"
 USERS_STATS_PATH = "txt_files/user_overview.txt"
+REPORT_FINGERPRINT_PATH = "txt_files/report_fingerprint.txt"
+LOCK_PATH = "txt_files/tasks.lock"
+TASKS_ARCHIVE_PATH = "txt_files/tasks_archive.txt"
+ARCHIVE_COUNTS_PATH = "txt_files/tasks_archive_counts.txt"
+
+# changes are grouped and saved to the journal by write_behind.py
+SAVE_EACH_CHANGE = False
+
+# the lock file is held by one thread at a time and can be taken again by that thread
+_lock = {"thread_lock": threading.RLock(), "depth": 0, "file": None}
+# size of tasks_journal.txt when this process last read or appended to it, the
+# task indexes with journal entries, or None if another process has appended to it,
+# and the generation and epoch in the journal header when it was last read or written
+_journal = {"size": None, "indexes": None, "generation": None, "epoch": None}
+# byte offset of each record in tasks.txt, and the stat of the tasks.txt they are for
+_offsets = {"offsets": None, "file": None}
+# the archived tasks once read, and the size of the archive when they were read
+_archive = {"tasks": None, "size": None}
+
+
+# *********************************WRITES***********************************#
+
+
+@contextmanager
+def storage_lock():
+    """
+    holds tasks.lock while the users and tasks are written, so two processes
+    never write them at the same time.
+    the operating system releases the lock if the process dies.
+    """
+    with _lock["thread_lock"]:
+        if _lock["depth"] == 0:
+            f = open(LOCK_PATH, "a+")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            except OSError:
+                f.close()
+                raise
+            _lock["file"] = f
+        _lock["depth"] += 1
+        try:
+            yield
+        finally:
+            _lock["depth"] -= 1
+            if _lock["depth"] == 0:
+                # closing the file releases the lock
+                _lock["file"].close()
+                _lock["file"] = None
+
+
+def replace_file(path, data, mode="w"):
+    """
+    writes a file to a temporary file first and moves it into place once it is
+    on disk, so a crash while writing leaves the old file as it was.
+    call it with storage_lock held so the temporary file is not shared.
+    param: path - the file to write.
+    param: data - the new contents, bytes if mode is "wb".
+    param: mode - "w" or "wb".
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 # *********************************TASKS************************************#
 
 
+def tasks_binary_mode():
+    """
+    the tasks are stored in tasks.bin instead of tasks.txt once it has been
+    created with convert_tasks_file.
+    returns: boolean.
+    """
+    return os.path.exists(TASKS_BIN_PATH)
+
+
 def read_tasks_file():
+    """
+    reads the tasks from tasks.bin if it exists, otherwise from tasks.txt.
+    returns: an iterator of task objects.
+    """
+    if tasks_binary_mode():
+        return read_tasks_snapshot()
+    return _read_tasks_text()
+
+
+def _read_tasks_text():
     """
     creates tasks.txt file if it doesn't exist.
-    reads every line of the file.
+    reads the file one line at a time so the whole file is never held in memory.
     if there is an exception an error message is displayed and the program terminates.
-    returns: the file contents.
+    returns: a generator of task objects.
     """
     if not os.path.exists(TASKS_PATH):
         with open(TASKS_PATH, "w") as default_file:
             pass
     try:
         with open(TASKS_PATH, "r") as f:
-            task_data = f.read().split("\n")
-            task_data = [t for t in task_data if t != ""]
-        return task_data
+            for line in f:
+                t_str = line.rstrip("\n")
+                if t_str != "":
+                    yield parse_task(t_str)
     except (FileNotFoundError, OSError):
         print("Fatal error opening file: 'tasks.txt'")
         sys.exit(1)
 
 
+def format_task_record(task_obj):
+    """
+    creates the line stored in tasks.txt for a single task.
+    param: task_obj - the task data.
+    returns: the task as a ; separated string.
+    """
+    str_attrs = [
+        task_obj["username"],
+        task_obj["title"],
+        task_obj["description"],
+        task_obj["due_date"].strftime(DATETIME_STRING_FORMAT),
+        task_obj["assigned_date"].strftime(DATETIME_STRING_FORMAT),
+        # padded to the length of Yes so a task is marked as complete in place
+        "Yes" if task_obj["completed"] else "No ",
+    ]
+    return ";".join(str_attrs)
+
+
 def write_tasks_file(task_list):
     """
-    writes to tasks.txt file with new task data.
+    writes to tasks.txt file, or tasks.bin if it exists, with new task data.
     if there is an exception an error message is displayed.
     param: task_list - list of objects. each object is the task data.
+    returns: boolean - True if the file was written.
     """
+    if tasks_binary_mode():
+        return write_tasks_snapshot(task_list)
+    return _write_tasks_text(task_list, TASKS_PATH)
+
+
+def _write_tasks_text(task_list, path):
+    task_list_to_write = []
+    for task_obj in task_list:
+        task_list_to_write.append(format_task_record(task_obj))
     try:
-        with open(TASKS_PATH, "w") as f:
-            task_list_to_write = []
-            for task_obj in task_list:
-                str_attrs = [
-                    task_obj["username"],
-                    task_obj["title"],
-                    task_obj["description"],
-                    task_obj["due_date"].strftime(DATETIME_STRING_FORMAT),
-                    task_obj["assigned_date"].strftime(DATETIME_STRING_FORMAT),
-                    "Yes" if task_obj["completed"] else "No",
-                ]
-                task_list_to_write.append(";".join(str_attrs))
-            f.write("\n".join(task_list_to_write))
+        with storage_lock():
+            replace_file(path, "\n".join(task_list_to_write))
+        return True
     except (FileNotFoundError, OSError):
         print("Error opening file: 'tasks.txt'")
+        return False
+
+
+def read_tasks_journal():
+    """
+    reads every line of tasks_journal.txt.
+    each line is a change made to tasks.txt since it was last compacted:
+        a;index;task record - a new task.
+        u;index;task record - an edited task.
+        c;index             - a task marked as complete.
+    every entry ends with a newline, a last line without one was cut short by a
+    crash while it was appended and is left out.
+    the journal of a compacted tasks.txt starts with a header line which is not
+    returned:
+        g;generation;epoch  - generation is a new random value each time tasks.txt
+                              is rewritten, epoch each time its tasks are renumbered.
+    if there is an exception an error message is displayed and the program terminates.
+    returns: the journal entries or an empty list if there is no journal.
+    """
+    if not os.path.exists(TASKS_JOURNAL_PATH):
+        _journal["size"] = 0
+        _journal["indexes"] = set()
+        _journal["generation"], _journal["epoch"] = _parse_journal_header("")
+        return []
+    try:
+        with open(TASKS_JOURNAL_PATH, "r") as f:
+            _journal["size"] = os.fstat(f.fileno()).st_size
+            journal_data = f.read().split("\n")
+            # the empty string after the last newline, or the cut short entry
+            journal_data.pop()
+            journal_data = [j for j in journal_data if j != ""]
+        header = ""
+        if journal_data and journal_data[0].startswith("g;"):
+            header = journal_data.pop(0) + "\n"
+        _journal["generation"], _journal["epoch"] = _parse_journal_header(header)
+        _journal["indexes"] = {int(j.split(";", 2)[1]) for j in journal_data}
+        return journal_data
+    except (FileNotFoundError, OSError):
+        print("Fatal error opening file: 'tasks_journal.txt'")
+        sys.exit(1)
+
+
+def append_tasks_journal(task_list, task_changes, saved_task_list=None):
+    """
+    appends one journal entry per changed task to tasks_journal.txt.
+    only the changed tasks are written so the cost depends on the number of changes.
+    a changed task whose record is still the same length, e.g. marked as complete or
+    given a new due date, is patched in place in tasks.txt instead, if its stored
+    record is still the one in saved_task_list.
+    every entry holds the task index so replaying an entry twice is harmless.
+    the changes are on disk when it returns.
+    nothing is saved if another process has added tasks since this one last read or
+    appended to the journal, the new tasks of both would have the same indexes.
+    the journal size and header are both checked, compacting empties the journal
+    so its size alone may be the same again.
+    nothing is saved if another process has archived tasks since, the task indexes
+    of this process are out of date.
+    if there is an exception an error message is displayed.
+    param: task_list - list of objects. each object is the task data.
+    param: task_changes - dict of task index to change type ("a", "u" or "c").
+    param: saved_task_list - the task_list as it was when last saved, or None to
+                             journal every change.
+    returns: boolean - True if the changes were written.
+    """
+    added = [idx for idx, change in task_changes.items() if change == "a"]
+    try:
+        with storage_lock():
+            epoch = _read_journal_header()[1]
+            if _journal["epoch"] is not None and epoch != _journal["epoch"]:
+                print("Error saving changes: tasks were archived by another user")
+                return False
+            if _journal_changed():
+                # another process has saved, its task indexes are not known
+                _journal["indexes"] = None
+                # the new tasks would be saved over the tasks it added
+                if added and _stored_task_count() != min(added):
+                    print("Error saving new tasks: tasks were added by another user")
+                    return False
+            task_changes = patch_tasks_file(task_list, task_changes, saved_task_list)
+            if not task_changes:
+                return True
+            entries = ""
+            # new tasks must be replayed in index order
+            for idx in sorted(task_changes):
+                change = task_changes[idx]
+                if change == "c":
+                    entries += f"c;{idx}\n"
+                else:
+                    entries += f"{change};{idx};{format_task_record(task_list[idx])}\n"
+            _remove_cut_short_entry(TASKS_JOURNAL_PATH)
+            with open(TASKS_JOURNAL_PATH, "a") as f:
+                f.write(entries)
+                f.flush()
+                os.fsync(f.fileno())
+                _journal["size"] = os.fstat(f.fileno()).st_size
+            if _journal["indexes"] is not None:
+                _journal["indexes"].update(task_changes)
+        return True
+    except (FileNotFoundError, OSError):
+        print("Error opening file: 'tasks_journal.txt'")
+        return False
+
+
+def _journal_file_size():
+    if not os.path.exists(TASKS_JOURNAL_PATH):
+        return 0
+    return os.path.getsize(TASKS_JOURNAL_PATH)
+
+
+def _read_journal_header():
+    # (generation, epoch) from the header of tasks_journal.txt
+    if not os.path.exists(TASKS_JOURNAL_PATH):
+        return _parse_journal_header("")
+    with open(TASKS_JOURNAL_PATH, "r") as f:
+        return _parse_journal_header(f.readline())
+
+
+def _parse_journal_header(header):
+    # a journal without a header has not been compacted since the tasks were numbered
+    if header.startswith("g;") and header.endswith("\n"):
+        generation, _, epoch = header[2:-1].partition(";")
+        return generation, epoch or "0"
+    return None, "0"
+
+
+def _journal_changed():
+    # True if another process has saved since this one last read or wrote the journal.
+    # each rewrite of tasks.txt starts a journal with a new generation and the
+    # journal only grows until the next one, so neither check can repeat
+    header = (_journal["generation"], _journal["epoch"])
+    return _journal_file_size() != _journal["size"] or _read_journal_header() != header
+
+
+def _start_tasks_journal(renumbered=False):
+    # empties tasks_journal.txt after tasks.txt is rewritten. call it with storage_lock held.
+    # the epoch is only changed when the task indexes have changed, a process still
+    # holding the old ones must not save
+    generation = os.urandom(8).hex()
+    epoch = os.urandom(8).hex() if renumbered else _journal["epoch"] or "0"
+    with open(TASKS_JOURNAL_PATH, "w") as f:
+        f.write(f"g;{generation};{epoch}\n")
+        f.flush()
+        os.fsync(f.fileno())
+        _journal["size"] = os.fstat(f.fileno()).st_size
+    _journal["indexes"] = set()
+    _journal["generation"] = generation
+    _journal["epoch"] = epoch
+
+
+def _stored_task_count():
+    # the tasks in the snapshot followed by the tasks added in the journal,
+    # counted the way replay_journal reads them
+    if tasks_binary_mode():
+        with open(TASKS_BIN_PATH, "rb") as f:
+            count = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))[2]
+    elif os.path.exists(TASKS_PATH):
+        with open(TASKS_PATH, "r") as f:
+            count = sum(line.rstrip("\n") != "" for line in f)
+    else:
+        count = 0
+    if os.path.exists(TASKS_JOURNAL_PATH):
+        with open(TASKS_JOURNAL_PATH, "r") as f:
+            journaled = {
+                int(j.split(";", 2)[1])
+                for j in f
+                if j.endswith("\n") and not j.startswith("g;")
+            }
+        while count in journaled:
+            count += 1
+    return count
+
+
+def patch_tasks_file(task_list, task_changes, saved_task_list):
+    """
+    writes changed tasks over their records in tasks.txt, so saving a change costs
+    the size of one record instead of the whole file.
+    only tasks without journal entries are patched, replaying the journal would undo
+    the patch. a record which changes length can't be patched, nor one which is not
+    the record of the task in saved_task_list, another process has changed it.
+    call it with storage_lock held.
+    param: task_list - list of task objects.
+    param: task_changes - dict of task index to change type ("a", "u" or "c").
+    param: saved_task_list - the task_list as it was when last saved, or None.
+    returns: dict of the task changes which were not patched.
+    """
+    journaled = _journal["indexes"]
+    if journaled is None or saved_task_list is None:
+        return task_changes
+    if tasks_binary_mode() or not hasattr(os, "pwrite"):
+        return task_changes
+    patchable = [
+        idx
+        for idx, change in task_changes.items()
+        if change != "a" and idx not in journaled and idx < len(saved_task_list)
+    ]
+    if not patchable or not os.path.exists(TASKS_PATH):
+        return task_changes
+    remaining = dict(task_changes)
+    encoding = locale.getpreferredencoding(False)
+    try:
+        with open(TASKS_PATH, "r+b") as f:
+            fd = f.fileno()
+            offsets = _get_record_offsets(f)
+            if offsets is None:
+                return task_changes
+            size = os.fstat(fd).st_size
+            for idx in patchable:
+                if idx >= len(offsets):
+                    continue
+                start = offsets[idx]
+                stop = offsets[idx + 1] if idx + 1 < len(offsets) else size
+                old = os.pread(fd, stop - start, start).split(b"\n", 1)[0]
+                # the same encoding as the text mode writes
+                saved = format_task_record(saved_task_list[idx]).encode(encoding)
+                new = format_task_record(task_list[idx]).encode(encoding)
+                if old != saved or len(new) != len(old):
+                    continue
+                # only the bytes which changed are written, e.g. No to Yes
+                first, last = 0, len(new)
+                while first < last and new[first] == old[first]:
+                    first += 1
+                while last > first and new[last - 1] == old[last - 1]:
+                    last -= 1
+                if first < last:
+                    os.pwrite(fd, new[first:last], start + first)
+                del remaining[idx]
+            os.fsync(fd)
+            # the patches moved no records
+            _offsets["file"] = _file_key(os.fstat(fd))
+    except OSError:
+        # whatever was not patched is journaled
+        pass
+    return remaining
+
+
+def _get_record_offsets(f):
+    # the offsets are found once and stay right while records keep their length
+    stat = os.fstat(f.fileno())
+    if _offsets["file"] == _file_key(stat):
+        return _offsets["offsets"]
+    if stat.st_size:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # a \r is read as a line break too, such a file is left to the journal
+            if data.find(b"\r") != -1:
+                return None
+    f.seek(0)
+    lengths = list(map(len, f))
+    # blank lines are skipped by _read_tasks_text
+    offsets = array(
+        "Q", compress(accumulate(lengths[:-1], initial=0), map((1).__ne__, lengths))
+    )
+    _offsets["offsets"] = offsets
+    _offsets["file"] = _file_key(stat)
+    return offsets
+
+
+def _file_key(stat):
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _remove_cut_short_entry(path):
+    # an entry cut short by a crash would run into the next entry appended
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                pos = start + newline + 1
+                break
+            pos = start
+        if pos < end:
+            f.truncate(pos)
+
+
+def tasks_journal_needs_compaction():
+    """
+    checks if the journal has grown large enough to fold back into tasks.txt.
+    compacting once the journal is half the size of tasks.txt keeps the
+    rewrite cost proportional to the number of changes journaled.
+    returns: boolean.
+    """
+    if not os.path.exists(TASKS_JOURNAL_PATH):
+        return False
+    journal_size = os.path.getsize(TASKS_JOURNAL_PATH)
+    if _journal["generation"] is not None:
+        # the header is not a change
+        journal_size -= len(f"g;{_journal['generation']};{_journal['epoch']}\n")
+    tasks_path = TASKS_BIN_PATH if tasks_binary_mode() else TASKS_PATH
+    tasks_size = os.path.getsize(tasks_path) if os.path.exists(tasks_path) else 0
+    return journal_size > 0 and journal_size * 2 >= tasks_size
+
+
+def compact_tasks_file(task_list):
+    """
+    writes the full task list to tasks.txt and empties tasks_journal.txt.
+    nothing is done if another process has changed the journal since this one last
+    read or appended to it, the task_list would not hold those changes.
+    if there is an exception an error message is displayed.
+    param: task_list - list of objects. each object is the task data.
+    returns: boolean - True if the tasks were written and the journal emptied.
+    """
+    try:
+        with storage_lock():
+            if _journal["size"] is not None and _journal_changed():
+                return False
+            # keep the journal if the snapshot could not be written
+            if not write_tasks_file(task_list):
+                return False
+            # replaying the old journal on the new snapshot is harmless if this fails
+            _start_tasks_journal()
+        return True
+    except (FileNotFoundError, OSError):
+        print("Error opening file: 'tasks_journal.txt'")
+        return False
+
+
+# ****************************BINARY SNAPSHOT*******************************#
+
+"""
+tasks.bin layout, all integers little endian:
+    header     - b"DOIT", version u16, number of tasks u32, number of users u32.
+    user table - for each user: name length u16, utf-8 name, number of tasks u32.
+    columns    - one value per task, in task_list order:
+                 user table index u32, due date ordinal i32, assigned date ordinal i32,
+                 completed u8.
+    strings    - for titles then descriptions: the character offset of each string in
+                 the text u64 * (number of tasks + 1), the text length in bytes u64,
+                 utf-8 text with a NUL after each string.
+the string offsets are record offsets into the text, so a task is read without
+splitting records or parsing dates. the NULs let a whole column be split at once,
+the offsets are used instead if a string contains a NUL.
+"""
+SNAPSHOT_MAGIC = b"DOIT"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHII")
+SNAPSHOT_USER = struct.Struct("<H")
+SNAPSHOT_COUNT = struct.Struct("<I")
+SNAPSHOT_LENGTH = struct.Struct("<Q")
+
+
+def _array_to_bytes(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _array_from_bytes(typecode, data, pos, count):
+    column = array(typecode)
+    end = pos + column.itemsize * count
+    column.frombytes(data[pos:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+def _strings_to_bytes(strings):
+    offsets = [0]
+    for string in strings:
+        offsets.append(offsets[-1] + len(string) + 1)
+    text = "".join([f"{string}\0" for string in strings]).encode("utf-8")
+    return (
+        _array_to_bytes("Q", offsets) + SNAPSHOT_LENGTH.pack(len(text)) + text
+    )
+
+
+def _strings_from_bytes(data, pos, count):
+    offsets, pos = _array_from_bytes("Q", data, pos, count + 1)
+    (text_len,) = SNAPSHOT_LENGTH.unpack_from(data, pos)
+    pos += SNAPSHOT_LENGTH.size
+    text = bytes(data[pos : pos + text_len]).decode("utf-8")
+    strings = text.split("\0")
+    # the last split is the empty string after the final NUL
+    if len(strings) != count + 1:
+        strings = [text[start : end - 1] for start, end in zip(offsets, offsets[1:])]
+    else:
+        strings.pop()
+    return strings, pos + text_len
+
+
+def write_tasks_snapshot(task_list, path=TASKS_BIN_PATH):
+    """
+    writes the tasks to a binary snapshot.
+    if there is an exception an error message is displayed.
+    param: task_list - list of task objects.
+    param: path - the snapshot file.
+    returns: boolean - True if the file was written.
+    """
+    user_idx = {}
+    user_counts = []
+    user_col = []
+    titles = []
+    descriptions = []
+    for task in task_list:
+        idx = user_idx.get(task.username)
+        if idx is None:
+            idx = user_idx[task.username] = len(user_counts)
+            user_counts.append(0)
+        user_counts[idx] += 1
+        user_col.append(idx)
+        titles.append(task.title)
+        descriptions.append(task.description)
+    parts = [
+        SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(user_col), len(user_counts)
+        )
+    ]
+    for username, count in zip(user_idx, user_counts):
+        name = username.encode("utf-8")
+        parts.append(SNAPSHOT_USER.pack(len(name)) + name + SNAPSHOT_COUNT.pack(count))
+    parts.append(_array_to_bytes("I", user_col))
+    parts.append(_array_to_bytes("i", [task.due_ordinal for task in task_list]))
+    parts.append(_array_to_bytes("i", [task.assigned_ordinal for task in task_list]))
+    parts.append(bytes(task.completed for task in task_list))
+    parts.append(_strings_to_bytes(titles))
+    parts.append(_strings_to_bytes(descriptions))
+    try:
+        with storage_lock():
+            replace_file(path, b"".join(parts), "wb")
+        return True
+    except (FileNotFoundError, OSError):
+        print(f"Error opening file: '{os.path.basename(path)}'")
+        return False
+
+
+def read_tasks_snapshot_header(data):
+    """
+    reads the header and user table of a binary snapshot.
+    param: data - the snapshot contents.
+    returns: (num_tasks, {username: num_tasks}, position of the columns).
+    """
+    magic, version, num_tasks, num_users = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError("not a tasks snapshot")
+    pos = SNAPSHOT_HEADER.size
+    user_counts = {}
+    for _ in range(num_users):
+        (name_len,) = SNAPSHOT_USER.unpack_from(data, pos)
+        pos += SNAPSHOT_USER.size
+        username = bytes(data[pos : pos + name_len]).decode("utf-8")
+        pos += name_len
+        (user_counts[username],) = SNAPSHOT_COUNT.unpack_from(data, pos)
+        pos += SNAPSHOT_COUNT.size
+    return num_tasks, user_counts, pos
+
+
+def read_tasks_snapshot(path=TASKS_BIN_PATH):
+    """
+    reads the tasks from a binary snapshot.
+    each column is read in one step and the task objects are built without any parsing.
+    if there is an exception an error message is displayed and the program terminates.
+    param: path - the snapshot file.
+    returns: an iterator of task objects.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = memoryview(f.read())
+        num_tasks, user_counts, pos = read_tasks_snapshot_header(data)
+    except (FileNotFoundError, OSError, ValueError, struct.error):
+        print(f"Fatal error opening file: '{os.path.basename(path)}'")
+        sys.exit(1)
+    usernames = list(map(sys.intern, user_counts))
+    user_col, pos = _array_from_bytes("I", data, pos, num_tasks)
+    due_col, pos = _array_from_bytes("i", data, pos, num_tasks)
+    assigned_col, pos = _array_from_bytes("i", data, pos, num_tasks)
+    completed_col = [c == 1 for c in data[pos : pos + num_tasks]]
+    pos += num_tasks
+    titles, pos = _strings_from_bytes(data, pos, num_tasks)
+    descriptions, pos = _strings_from_bytes(data, pos, num_tasks)
+    text_counts.update(titles)
+    text_counts.update(descriptions)
+    return map(
+        Task,
+        [usernames[idx] for idx in user_col],
+        map(text_pool.setdefault, titles, titles),
+        map(text_pool.setdefault, descriptions, descriptions),
+        due_col,
+        assigned_col,
+        completed_col,
+    )
+
+
+def convert_tasks_file(to_binary):
+    """
+    converts the stored tasks between tasks.txt and tasks.bin.
+    the journal is folded into the new file and the old file is removed.
+    param: to_binary - True to convert tasks.txt to tasks.bin, False for the reverse.
+    returns: boolean - True if the tasks were converted.
+    """
+    with storage_lock():
+        return _convert_tasks_file(to_binary)
+
+
+def _convert_tasks_file(to_binary):
+    if tasks_binary_mode() == to_binary:
+        return False
+    task_list = list(replay_journal(read_tasks_file(), read_tasks_journal()))
+    if to_binary:
+        old_path = TASKS_PATH
+        written = write_tasks_snapshot(task_list)
+    else:
+        # write_tasks_file only writes tasks.txt once tasks.bin has been moved aside
+        old_path = TASKS_BIN_PATH + ".old"
+        os.replace(TASKS_BIN_PATH, old_path)
+        written = write_tasks_file(task_list)
+        if not written:
+            os.replace(old_path, TASKS_BIN_PATH)
+    if not written:
+        return False
+    if os.path.exists(old_path):
+        os.remove(old_path)
+    _start_tasks_journal()
+    return True
+
+
+# *********************************ARCHIVE**********************************#
+
+"""
+completed tasks which are no longer needed day to day are moved out of tasks.txt
+into tasks_archive.txt, which is only read when all the tasks are displayed.
+tasks_archive_counts.txt holds the number of archived tasks of each user so the
+reports never read the archive:
+    the size of tasks_archive.txt in bytes
+    username;number of archived tasks
+    ...
+"""
+
+
+def read_archive_counts():
+    """
+    reads the number of archived tasks of each user.
+    the counts are worked out again from the archive if a crash left them behind it.
+    if there is an exception an error message is displayed.
+    returns: dict of username to the number of archived tasks.
+    """
+    if not os.path.exists(TASKS_ARCHIVE_PATH):
+        return {}
+    try:
+        archive_size = os.path.getsize(TASKS_ARCHIVE_PATH)
+        if os.path.exists(ARCHIVE_COUNTS_PATH):
+            with open(ARCHIVE_COUNTS_PATH, "r") as f:
+                size, *lines = f.read().split("\n")
+            if size == str(archive_size):
+                counts = {}
+                for line in lines:
+                    if line:
+                        username, count = line.rsplit(";", 1)
+                        counts[username] = int(count)
+                return counts
+        counts = {}
+        for task in read_tasks_archive():
+            counts[task.username] = counts.get(task.username, 0) + 1
+        with storage_lock():
+            _write_archive_counts(counts)
+        return counts
+    except (FileNotFoundError, OSError, ValueError):
+        print("Error opening file: 'tasks_archive_counts.txt'")
+        return {}
+
+
+def _write_archive_counts(counts):
+    lines = [str(os.path.getsize(TASKS_ARCHIVE_PATH))]
+    lines += [f"{username};{count}" for username, count in counts.items()]
+    replace_file(ARCHIVE_COUNTS_PATH, "\n".join(lines) + "\n")
+
+
+def read_tasks_archive():
+    """
+    reads the archived tasks the first time they are needed.
+    if there is an exception an error message is displayed.
+    returns: list of the archived task objects, oldest first.
+    """
+    try:
+        size = os.path.getsize(TASKS_ARCHIVE_PATH)
+    except OSError:
+        return []
+    # the archive only changes when tasks are archived
+    if _archive["size"] != size:
+        try:
+            with open(TASKS_ARCHIVE_PATH, "r") as f:
+                _archive["tasks"] = [
+                    parse_archived_task(line.rstrip("\n"))
+                    for line in f
+                    if line != "\n"
+                ]
+            _archive["size"] = size
+        except (FileNotFoundError, OSError):
+            print("Error opening file: 'tasks_archive.txt'")
+            return []
+    return _archive["tasks"]
+
+
+def archive_tasks(task_list, archived_tasks):
+    """
+    appends completed tasks to tasks_archive.txt and writes the remaining tasks to
+    tasks.txt, emptying tasks_journal.txt like compact_tasks_file.
+    the task indexes change, so it is only used before any changes are made.
+    nothing is done if another process has changed the journal since this one last
+    read or appended to it.
+    if there is an exception an error message is displayed.
+    param: task_list - list of the task objects which stay in tasks.txt.
+    param: archived_tasks - list of the task objects to archive.
+    returns: boolean - True if the tasks were archived.
+    """
+    try:
+        with storage_lock():
+            if _journal["size"] is not None and _journal_changed():
+                return False
+            # the new tasks file is written first, so if that fails nothing has changed
+            tasks_path = TASKS_BIN_PATH if tasks_binary_mode() else TASKS_PATH
+            new_path = tasks_path + ".new"
+            if tasks_binary_mode():
+                written = write_tasks_snapshot(task_list, new_path)
+            else:
+                written = _write_tasks_text(task_list, new_path)
+            if not written:
+                return False
+            counts = read_archive_counts()
+            _remove_cut_short_entry(TASKS_ARCHIVE_PATH)
+            with open(TASKS_ARCHIVE_PATH, "a") as f:
+                f.write("".join(f"{format_task_record(t)}\n" for t in archived_tasks))
+                f.flush()
+                os.fsync(f.fileno())
+            for task in archived_tasks:
+                counts[task.username] = counts.get(task.username, 0) + 1
+            _write_archive_counts(counts)
+            # a crash before tasks.txt is replaced leaves these tasks in both files
+            os.replace(new_path, tasks_path)
+            _start_tasks_journal(renumbered=True)
+        return True
+    except (FileNotFoundError, OSError):
+        print("Error opening file: 'tasks_archive.txt'")
+        return False
 
 
 # *********************************USERS************************************#
@@ -82,72 +857,76 @@ def write_users_file(user_list):
     """
     writes to users.txt file with new user data.
     if there is an exception an error message is displayed.
-    param: user_list - list of objects. each object is the user data.
+    param: user_list - dict of objects keyed by username. each object is the user data.
+    returns: boolean - True if the file was written.
     """
     users = ""
-    for user_obj in user_list:
+    for user_obj in user_list.values():
         users += f"{user_obj['username']};{user_obj['password']}\n"
     try:
-        with open(USERS_PATH, "w") as f:
-            f.write(users)
+        with storage_lock():
+            replace_file(USERS_PATH, users)
+        return True
     except (FileNotFoundError, OSError):
         print("Error opening file: 'user.txt'")
+        return False
 
 
 # *********************************STATS************************************#
 
 
-def read_task_overview_file():
+def write_task_overview_file(report):
     """
-    returns -1 if task_overview.txt" doesn't exist or the contents of the file.
+    writes to task_overview.txt" with new task data
     if there is an exception an error message is displayed.
+    param: report - string of report data.
     """
-    if not os.path.exists(TASKS_STATS_PATH):
-        return -1
     try:
-        with open(TASKS_STATS_PATH, "r") as f:
-            report = f.read()
-        return report
+        with open(TASKS_STATS_PATH, "w") as f:
+            f.write(report)
     except (FileNotFoundError, OSError):
         print("Error opening file: 'task_overview.txt'")
 
 
-def write_task_overview_file(report):
+def write_user_overview_file(report):
     """
-    writes to task_overview.txt" with new task data
+    writes to user_overview.txt" with new user data
     if there is an exception an error message is displayed.
-    param: report - string of report data.
+    param: report - string of report data
     """
     try:
-        with open(TASKS_STATS_PATH, "w") as f:
+        with open(USERS_STATS_PATH, "w") as f:
             f.write(report)
     except (FileNotFoundError, OSError):
-        print("Error opening file: 'task_overview.txt'")
+        print("Error opening file: 'user_overview.txt'")
 
 
-def read_user_overview_file():
+def read_report_fingerprint_file():
     """
-    returns -1 if user_overview.txt" doesn't exist or the contents of the file.
+    returns -1 if report_fingerprint.txt, task_overview.txt or user_overview.txt doesn't exist,
+    or the fingerprint of the saved reports.
     if there is an exception an error message is displayed.
     """
-    if not os.path.exists(USERS_STATS_PATH):
-        return -1
+    for path in (REPORT_FINGERPRINT_PATH, TASKS_STATS_PATH, USERS_STATS_PATH):
+        if not os.path.exists(path):
+            return -1
     try:
-        with open(USERS_STATS_PATH, "r") as f:
-            report = f.read()
-        return report
+        with open(REPORT_FINGERPRINT_PATH, "r") as f:
+            fingerprint = f.read().strip()
+        return fingerprint
     except (FileNotFoundError, OSError):
-        print("Error opening file: 'user_overview.txt'")
+        print("Error opening file: 'report_fingerprint.txt'")
+        return -1
 
 
-def write_user_overview_file(report):
+def write_report_fingerprint_file(fingerprint):
     """
-    writes to user_overview.txt" with new user data
+    writes the fingerprint of the saved reports to report_fingerprint.txt.
     if there is an exception an error message is displayed.
-    param: report - string of report data
+    param: fingerprint - the fingerprint string.
     """
     try:
-        with open(USERS_STATS_PATH, "w") as f:
-            f.write(report)
+        with open(REPORT_FINGERPRINT_PATH, "w") as f:
+            f.write(fingerprint)
     except (FileNotFoundError, OSError):
-        print("Error opening file: 'user_overview.txt'")
+        print("Error opening file: 'report_fingerprint.txt'")
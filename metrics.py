@@ -0,0 +1,334 @@
+"""Opt-in timing and memory metrics for the menu commands and storage calls.
+python3 task_manager.py --metrics prints a summary at every logout and
+python3 task_manager.py --metrics-file metrics.json writes it to a file instead.
+The time spent waiting for the user to type is not counted.
+When metrics are off, measure() returns a shared no-op context manager and
+the storage functions are not wrapped, so the program runs as before.
+Memory is traced with tracemalloc, which slows the program while it is on.
+tracemalloc counts the whole process, so a measurement also counts what other
+threads, like the write-behind timer, allocate while it runs.
+"""
+
+import builtins
+import functools
+import json
+import math
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+
+metrics = {
+    "enabled": False,
+    "memory": False,
+    "path": None,  # the metrics file, or None to print the summary
+    "waiting": 0.0,  # seconds spent waiting for input, left out of the measurements
+    "stats": {},  # name to the stats of every measurement with that name
+    "counters": {},  # name to a function returning dict of counter to value
+}
+
+# each thread's measurements in progress, innermost last.
+# each is [start memory, peak memory]
+_local = threading.local()
+# guards the stats, the write-behind timer thread records measurements too
+_stats_lock = threading.Lock()
+
+# the histogram buckets are 1/8 of a doubling wide, about 9% of the time
+BUCKETS_PER_DOUBLING = 8
+
+
+class _Measurement:
+    __slots__ = ("name", "start", "waiting", "frame")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.frame = None
+        if metrics["memory"]:
+            memory_stack = _memory_stack()
+            current, peak = tracemalloc.get_traced_memory()
+            # the peak so far belongs to the outer measurement
+            if memory_stack:
+                memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self.frame = [current, current]
+            memory_stack.append(self.frame)
+        # only the main thread waits for input, other threads keep running meanwhile
+        self.waiting = None
+        if threading.current_thread() is threading.main_thread():
+            self.waiting = metrics["waiting"]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        if self.waiting is not None:
+            seconds -= metrics["waiting"] - self.waiting
+        allocated = peak = 0
+        if self.frame is not None:
+            memory_stack = _memory_stack()
+            current, traced_peak = tracemalloc.get_traced_memory()
+            memory_stack.pop()
+            peak = max(self.frame[1], traced_peak)
+            if memory_stack:
+                memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+            allocated = current - self.frame[0]
+            peak -= self.frame[0]
+        record(self.name, seconds, allocated, peak)
+        return False
+
+
+def _memory_stack():
+    # the measurements in progress on this thread
+    if not hasattr(_local, "memory_stack"):
+        _local.memory_stack = []
+    return _local.memory_stack
+
+
+class _NoMeasurement:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_MEASUREMENT = _NoMeasurement()
+
+
+def enable_metrics(path=None, memory=True):
+    """
+    starts recording metrics.
+    param: path - optional metrics file written by dump_metrics instead of printing.
+    param: memory - trace the memory allocated by each measurement.
+    """
+    metrics["enabled"] = True
+    metrics["path"] = path
+    metrics["memory"] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def metrics_enabled():
+    """
+    returns: boolean - True if metrics are being recorded.
+    """
+    return metrics["enabled"]
+
+
+def measure(name):
+    """
+    measures the wall time and memory of a block of code, e.g.
+        with measure("command gr"):
+            gen_reports(...)
+    param: name - the name the measurement is recorded under.
+    returns: a context manager.
+    """
+    if not metrics["enabled"]:
+        return _NO_MEASUREMENT
+    return _Measurement(name)
+
+
+def add_counters(name, counters_cb):
+    """
+    adds counts kept by another module to the summary, e.g. the report cache hits.
+    param: name - the name the counts are listed under.
+    param: counters_cb - function which returns dict of counter name to value.
+    """
+    metrics["counters"][name] = counters_cb
+
+
+def instrument_module(module, prefixes, namespace=None):
+    """
+    wraps the functions of a module whose names start with one of the prefixes so
+    every call is measured as "<module>.<function>".
+    param: module - the module, e.g. file_access.
+    param: prefixes - tuple of name prefixes, e.g. ("read_", "write_").
+    param: namespace - optional globals() of a module that imported the functions by name,
+                       the same functions are replaced there too.
+    """
+    if not metrics["enabled"]:
+        return
+    for name, func in list(vars(module).items()):
+        if not (callable(func) and name.startswith(prefixes)):
+            continue
+        if getattr(func, "__wrapped__", None) is not None:
+            continue
+        wrapper = _measured(f"{module.__name__}.{name}", func)
+        setattr(module, name, wrapper)
+        if namespace is not None and namespace.get(name) is func:
+            namespace[name] = wrapper
+
+
+def instrument_input(namespace):
+    """
+    replaces input in a module so the time spent waiting for the user is left out
+    of every measurement in progress.
+    param: namespace - globals() of the module that calls input.
+    """
+    if not metrics["enabled"]:
+        return
+
+    def waiting_input(prompt=""):
+        start = time.perf_counter()
+        try:
+            return builtins.input(prompt)
+        finally:
+            metrics["waiting"] += time.perf_counter() - start
+
+    namespace["input"] = waiting_input
+
+
+def _measured(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _Measurement(name):
+            result = func(*args, **kwargs)
+        # a reader that returns an iterator does its work as it is read
+        if isinstance(result, Iterator):
+            return _measured_iter(f"{name} (iterate)", result)
+        return result
+
+    return wrapper
+
+
+def _measured_iter(name, items):
+    # only the time spent inside the iterator is counted, not the caller's
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        record(name, seconds)
+
+
+def record(name, seconds, allocated=0, peak=0):
+    """
+    adds a measurement to the stats of a name.
+    param: name - the measurement name.
+    param: seconds - the wall time.
+    param: allocated - bytes still allocated at the end.
+    param: peak - the most bytes allocated at once during the measurement.
+    """
+    bucket = _bucket(seconds)
+    with _stats_lock:
+        stats = metrics["stats"].get(name)
+        if stats is None:
+            stats = metrics["stats"][name] = {
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "allocated": 0,
+                "peak": 0,
+                "histogram": {},
+            }
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        stats["allocated"] += allocated
+        stats["peak"] = max(stats["peak"], peak)
+        stats["histogram"][bucket] = stats["histogram"].get(bucket, 0) + 1
+
+
+def _bucket(seconds):
+    # buckets of microseconds, everything under 1us is bucket 0
+    if seconds <= 1e-6:
+        return 0
+    return math.ceil(math.log2(seconds * 1e6) * BUCKETS_PER_DOUBLING)
+
+
+def _bucket_seconds(bucket):
+    # the upper bound of the bucket
+    return 2 ** (bucket / BUCKETS_PER_DOUBLING) / 1e6
+
+
+def percentile(stats, q):
+    """
+    estimates a percentile of the wall times from the histogram.
+    param: stats - the stats of a name.
+    param: q - the percentile, 0 to 100.
+    returns: the upper bound of the bucket holding the percentile, in seconds.
+    """
+    rank = max(1, math.ceil(stats["count"] * q / 100))
+    seen = 0
+    for bucket in sorted(stats["histogram"]):
+        seen += stats["histogram"][bucket]
+        if seen >= rank:
+            return min(_bucket_seconds(bucket), stats["max"])
+    return stats["max"]
+
+
+def get_metrics_summary():
+    """
+    returns: dict of name to count, total/mean/p50/p90/p99/max seconds and memory bytes,
+             and of each add_counters name to its counters.
+    """
+    summary = {}
+    with _stats_lock:
+        for name, stats in sorted(metrics["stats"].items()):
+            summary[name] = {
+                "count": stats["count"],
+                "total": stats["total"],
+                "mean": stats["total"] / stats["count"],
+                "p50": percentile(stats, 50),
+                "p90": percentile(stats, 90),
+                "p99": percentile(stats, 99),
+                "max": stats["max"],
+                "allocated": stats["allocated"],
+                "peak": stats["peak"],
+            }
+    for name, counters_cb in metrics["counters"].items():
+        summary[name] = counters_cb()
+    return summary
+
+
+def format_metrics_summary(summary):
+    """
+    param: summary - from get_metrics_summary.
+    returns: the summary as a table.
+    """
+    lines = [
+        f"{'name':<40}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+        f"{'max ms':>10}{'alloc KiB':>11}{'peak KiB':>10}"
+    ]
+    counters = []
+    for name, s in summary.items():
+        if "p50" not in s:
+            counts = ", ".join(f"{counter} {value}" for counter, value in s.items())
+            counters.append(f"{name:<40}{counts}")
+            continue
+        lines.append(
+            f"{name:<40}{s['count']:>7}{s['p50'] * 1000:>10.2f}{s['p90'] * 1000:>10.2f}"
+            f"{s['p99'] * 1000:>10.2f}{s['max'] * 1000:>10.2f}"
+            f"{s['allocated'] / 1024:>11.1f}{s['peak'] / 1024:>10.1f}"
+        )
+    return "\n".join(lines + counters)
+
+
+def dump_metrics():
+    """
+    writes the summary to the metrics file, or prints it if there is no file.
+    the summary covers everything since the program started.
+    does nothing if metrics are off.
+    """
+    if not metrics["enabled"]:
+        return
+    summary = get_metrics_summary()
+    if metrics["path"] is None:
+        print("\n" + format_metrics_summary(summary))
+        return
+    try:
+        with open(metrics["path"], "w") as f:
+            json.dump(summary, f, indent=2)
+    except OSError:
+        print(f"Error opening file: '{metrics['path']}'")
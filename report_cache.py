@@ -0,0 +1,73 @@
+"""Cache for the task and user reports.
+The reports only depend on the task statistics of each registered user and
+on the current date, so a fingerprint of those identifies a report. The last
+reports are kept in memory for ds, and the fingerprint of the reports saved
+by gr is kept in report_fingerprint.txt.
+"""
+
+import hashlib
+from datetime import date
+
+from task_stats import get_task_stats, get_user_stats
+
+report_cache = {
+    "fingerprint": None,
+    "task_report": -1,
+    "user_report": -1,
+    "hits": 0,
+    "misses": 0,
+}
+
+
+def get_report_fingerprint(task_stats, user_list):
+    """
+    creates a fingerprint of everything the reports depend on.
+    param: task_stats - the task statistics.
+    param: user_list - dict of user objects keyed by username.
+    returns: the fingerprint string.
+    """
+    user_stats = get_user_stats(task_stats, user_list)
+    key = repr(
+        (date.today().toordinal(), get_task_stats(task_stats), list(user_stats.items()))
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def get_cached_reports(fingerprint):
+    """
+    counts a hit if the cached reports match the fingerprint, or a miss.
+    param: fingerprint - the current fingerprint.
+    returns: (task report, user report) or None if the cache is stale.
+    """
+    if report_cache["fingerprint"] == fingerprint:
+        report_cache["hits"] += 1
+        return report_cache["task_report"], report_cache["user_report"]
+    report_cache["misses"] += 1
+    return None
+
+
+def cache_reports(fingerprint, task_report, user_report):
+    """
+    stores the reports for the fingerprint.
+    param: fingerprint - the fingerprint of the reports.
+    param: task_report - the task report or -1.
+    param: user_report - the user report or -1.
+    """
+    report_cache["fingerprint"] = fingerprint
+    report_cache["task_report"] = task_report
+    report_cache["user_report"] = user_report
+
+
+def count_report_hit(hit):
+    """
+    counts a hit or a miss for a check made outside the cache, e.g. the saved fingerprint.
+    param: hit - boolean.
+    """
+    report_cache["hits" if hit else "misses"] += 1
+
+
+def report_cache_info():
+    """
+    returns: dict of the hits and misses since the program started.
+    """
+    return {"hits": report_cache["hits"], "misses": report_cache["misses"]}
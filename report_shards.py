@@ -0,0 +1,146 @@
+"""Report statistics for very large tasks.txt files using several processes.
+tasks.txt is split into byte ranges that start and end on line boundaries.
+Each worker process parses and counts its own ranges, and the counts are
+added together into the same statistics as task_manager.get_report_data.
+python3 task_manager.py --analytics parallel selects this engine.
+"""
+
+import locale
+import os
+from datetime import date
+
+from task_store import parse_date_ordinal
+
+# each shard is read into memory by its worker, so large files are split into
+# more shards than workers to keep the memory of each worker bounded
+SHARD_SIZE = 32 * 1024 * 1024
+
+
+def get_shards(path, num_shards):
+    """
+    splits a file into byte ranges. every range starts at the beginning of a line
+    and ends after a newline or at the end of the file.
+    param: path - the file path.
+    param: num_shards - the number of ranges to aim for.
+    returns: list of (start, end) byte offsets, empty if the file is empty.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, num_shards):
+            if bounds[-1] >= size:
+                break
+            f.seek(max(size * i // num_shards, bounds[-1]))
+            # move to the start of the next line
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def count_shard(path, start, end, today_ordinal):
+    """
+    counts the tasks in a byte range of tasks.txt. runs in a worker process.
+    param: path - the tasks.txt path.
+    param: start, end - the byte range from get_shards.
+    param: today_ordinal - a due date before this is overdue.
+    returns: dict of username to [num_tasks, num_completed, num_incomplete, num_overdue].
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    user_counts = {}
+    # due date string to whether it is overdue
+    overdue_dates = {}
+    for t_str in data.decode(locale.getpreferredencoding(False)).split("\n"):
+        # a tasks.txt written in text mode on Windows ends its lines with \r\n
+        t_str = t_str.rstrip("\r")
+        if t_str == "":
+            continue
+        username, _, _, due_date, _, completed = t_str.split(";")
+        counts = user_counts.get(username)
+        if counts is None:
+            counts = user_counts[username] = [0, 0, 0, 0]
+        if completed == "Yes":
+            idx = 1
+        else:
+            overdue = overdue_dates.get(due_date)
+            if overdue is None:
+                overdue = overdue_dates[due_date] = (
+                    parse_date_ordinal(due_date) < today_ordinal
+                )
+            idx = 3 if overdue else 2
+        counts[0] += 1
+        counts[idx] += 1
+    for counts in user_counts.values():
+        counts[2] += counts[3]
+    return user_counts
+
+
+def merge_counts(partials, user_list):
+    """
+    adds the counts of every shard together.
+    param: partials - iterable of count_shard results.
+    param: user_list - dict of user objects keyed by username.
+    returns: (all_task_data, user_task_data), the same as get_report_data.
+    """
+    all_task_data = [0, 0, 0, 0]
+    user_task_data = {username: [0, 0, 0, 0] for username in user_list}
+    for user_counts in partials:
+        for username, counts in user_counts.items():
+            # tasks of deleted users only count towards the totals
+            totals = user_task_data.get(username)
+            for i in range(4):
+                all_task_data[i] += counts[i]
+                if totals is not None:
+                    totals[i] += counts[i]
+    return all_task_data, user_task_data
+
+
+def read_report_data(path, user_list, workers=None):
+    """
+    calculates the report statistics for a tasks.txt file with a pool of worker processes.
+    a file that fits in one shard is counted in this process.
+    param: path - the tasks.txt path.
+    param: user_list - dict of user objects keyed by username.
+    param: workers - number of worker processes, defaults to the number of cores.
+    returns: (all_task_data, user_task_data), the same as get_report_data.
+    """
+    workers = workers or os.cpu_count() or 1
+    num_shards = max(workers, -(-os.path.getsize(path) // SHARD_SIZE))
+    shards = get_shards(path, num_shards)
+    today_ordinal = date.today().toordinal()
+    if workers == 1 or len(shards) < 2:
+        partials = (count_shard(path, start, end, today_ordinal) for start, end in shards)
+        return merge_counts(partials, user_list)
+    # imported when needed, multiprocessing takes longer to import than the program
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(count_shard, path, start, end, today_ordinal)
+            for start, end in shards
+        ]
+        return merge_counts((future.result() for future in futures), user_list)
+
+
+def sharded_report_data(path, file_task_list, fallback_cb, workers=None):
+    """
+    creates a report data callback for gen_reports which reads tasks.txt in shards
+    while the task_list is the one loaded from it.
+    a task_list is never changed in place, so any change creates a new task_list and
+    the reports are then calculated from memory with fallback_cb.
+    param: path - the tasks.txt path.
+    param: file_task_list - the task_list as loaded from tasks.txt, or None if they differ,
+                            e.g. there were journal entries.
+    param: fallback_cb - function like get_report_data for any other task_list.
+    param: workers - number of worker processes, defaults to the number of cores.
+    returns: a function which consumes the task_list and user_list.
+    """
+
+    def report_data(task_list, user_list):
+        if file_task_list is None or task_list is not file_task_list:
+            return fallback_cb(task_list, user_list)
+        return read_report_data(path, user_list, workers)
+
+    return report_data
@@ -0,0 +1,590 @@
+"""Serves the task manager menus to many users from one process.
+python3 server.py --port 8765            - TCP on localhost:8765.
+python3 server.py --unix task_manager.sock - a Unix socket.
+Connect with e.g. nc localhost 8765. Each connection is a session with its own
+login, using the same menus and views as task_manager.py.
+The users, tasks and statistics are loaded once and shared by every session.
+The store is only changed by the event loop, between awaits, so a change is
+applied to the current tasks even if another session changed them while this
+one was waiting for input. Changes are saved by a single writer which groups
+the changes of all sessions into one journal append every --flush-interval
+seconds, or sooner once --flush-size changes are waiting.
+"""
+
+import argparse
+import asyncio
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import file_access
+from task_manager import (
+    DATETIME_STRING_FORMAT,
+    INVALID_DATE_FORMAT,
+    STORAGE_BACKENDS,
+    append_task,
+    check_login,
+    get_user_tasks,
+    get_change_type,
+    get_command_options,
+    get_current_reports,
+    get_edited_message,
+    get_task,
+    info_box,
+    load_task_data,
+    make_task,
+    register_user,
+    replace_task,
+    search_for_tasks,
+    unregister_user,
+    upcoming_deadlines,
+    user_has_open_tasks,
+    validate_due_date,
+    validate_task_number,
+    validate_text,
+    validate_user,
+)
+from report_cache import get_report_fingerprint
+from task_stats import add_archived_stats, build_task_stats, get_search_index
+from views import (
+    view_main_menu,
+    view_task_menu,
+    view_edit_task_menu,
+    view_users,
+    view_all,
+    view_my_tasks,
+    view_task,
+    view_stats,
+)
+from write_behind import CHANGE_PRIORITY
+
+FLUSH_INTERVAL = 1.0
+FLUSH_SIZE = 1000
+
+
+class SessionClosed(Exception):
+    """the client closed the connection."""
+
+
+class TaskStore:
+    """
+    the users, tasks and statistics shared by every session, and the changes not saved yet.
+    the user_list and task_list are replaced, never changed in place, so the writer can
+    save a snapshot while the sessions carry on.
+    """
+
+    def __init__(self, storage, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        # every storage call runs on this thread, sqlite connections can't change thread
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.user_list = {}
+        self.task_list = []
+        # the task_list as last saved, which the stored records are checked against
+        self.saved_task_list = None
+        self.task_stats = None
+        self.task_changes = {}
+        self.save_users = False
+        self.flush_now = asyncio.Event()
+        self.stopped = False  # set by stop_writer
+
+    async def load(self):
+        self.user_list, self.task_list, archive_counts = await self.run_storage(
+            load_task_data, self.storage
+        )
+        self.saved_task_list = self.task_list
+        self.task_stats = build_task_stats(self.task_list)
+        add_archived_stats(self.task_stats, archive_counts)
+        # built before the first session so no st waits for it
+        get_search_index(self.task_stats, self.task_list)
+
+    async def run_storage(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    def set_users(self, user_list):
+        self.user_list = user_list
+        self.save_users = True
+        self.flush_now.set()
+
+    def add_task(self, new_task):
+        """
+        appends a task to the current task_list.
+        param: new_task - the task object.
+        """
+        idx = len(self.task_list)
+        self.task_list = append_task(self.task_list, self.task_stats, new_task)
+        self._track(idx, None, new_task)
+
+    def replace_task(self, idx, old_task, new_task):
+        """
+        replaces a task unless another session changed it first.
+        param: idx - the task index.
+        param: old_task - the task object the session edited.
+        param: new_task - the edited task object.
+        returns: boolean - True if the task was replaced.
+        """
+        if self.task_list[idx] is not old_task:
+            return False
+        self.task_list = replace_task(
+            self.task_list, self.task_stats, idx, old_task, new_task
+        )
+        self._track(idx, old_task, new_task)
+        return True
+
+    def _track(self, idx, old_task, new_task):
+        # task_changes is swapped out by flush, never shared, so it is updated in place
+        self.task_changes[idx] = get_change_type(
+            self.task_changes.get(idx), old_task, new_task
+        )
+        if len(self.task_changes) >= self.flush_size:
+            self.flush_now.set()
+
+    async def flush(self):
+        """
+        saves every change made since the last flush in one write.
+        changes that could not be written are kept for the next flush.
+        returns: boolean - True if nothing is left unsaved.
+        """
+        self.flush_now.clear()
+        if not (self.save_users or self.task_changes):
+            return True
+        user_list = self.user_list if self.save_users else None
+        task_list, task_changes = self.task_list, self.task_changes
+        self.save_users = False
+        self.task_changes = {}
+        users_saved, tasks_saved = await self.run_storage(
+            self._write, user_list, task_list, task_changes
+        )
+        if not users_saved:
+            self.save_users = True
+        if tasks_saved:
+            self.saved_task_list = task_list
+        else:
+            # changes made while writing are merged with the failed ones
+            for idx, change in self.task_changes.items():
+                prev_change = task_changes.get(idx, change)
+                task_changes[idx] = max(prev_change, change, key=CHANGE_PRIORITY.get)
+            self.task_changes = task_changes
+        return users_saved and tasks_saved
+
+    def _write(self, user_list, task_list, task_changes):
+        users_saved = tasks_saved = True
+        if user_list is not None:
+            users_saved = self.storage.write_users_file(user_list)
+        if task_changes:
+            tasks_saved = self.storage.append_tasks_journal(
+                task_list, task_changes, self.saved_task_list
+            )
+            if tasks_saved and self.storage.tasks_journal_needs_compaction():
+                self.storage.compact_tasks_file(task_list)
+        return users_saved, tasks_saved
+
+    async def run_writer(self):
+        """
+        flushes the changes every flush_interval seconds, or sooner if flush_now is set,
+        until stop_writer is called.
+        """
+        while not self.stopped:
+            try:
+                await asyncio.wait_for(self.flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def stop_writer(self, writer_task):
+        """
+        stops run_writer and saves the last changes.
+        the writer is not cancelled, a flush it has started finishes and keeps the
+        changes it could not save for the last flush.
+        param: writer_task - the task running run_writer.
+        returns: boolean - True if nothing is left unsaved.
+        """
+        self.stopped = True
+        self.flush_now.set()
+        await writer_task
+        return await self.flush()
+
+
+class Session:
+    """
+    one connected user. the session is also the writer passed to the views.
+    """
+
+    def __init__(self, store, reader, writer):
+        self.store = store
+        self.reader = reader
+        self.writer = writer
+        self.user = None
+
+    def write(self, text):
+        self.writer.write(text.encode("utf-8"))
+
+    def print(self, text=""):
+        self.write(f"{text}\n")
+
+    async def input(self, prompt):
+        self.write(prompt)
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise SessionClosed()
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    async def input_user(self, msg, should_exist=True):
+        while True:
+            username = (await self.input(msg)).strip().lower()
+            error = validate_user(username, self.store.user_list, should_exist)
+            if error is None:
+                return username
+            self.print(info_box(error))
+
+    async def input_text(self, msg):
+        while True:
+            text = (await self.input(msg)).strip()
+            error = validate_text(text)
+            if error is None:
+                return text
+            self.print(info_box(error))
+
+    async def input_due_date(self):
+        while True:
+            try:
+                d = datetime.strptime(
+                    await self.input("Due date of task (YYYY-MM-DD): "),
+                    DATETIME_STRING_FORMAT,
+                )
+            except ValueError:
+                self.print(info_box(INVALID_DATE_FORMAT))
+                continue
+            error = validate_due_date(d, datetime.today())
+            if error is None:
+                return d
+            self.print(info_box(error))
+
+    async def input_int(self, msg):
+        while True:
+            try:
+                return int(await self.input(msg))
+            except ValueError:
+                self.print(info_box("Please enter a number"))
+
+    async def run(self):
+        self.print("\nWelcome to DO-IT-NOW! Task Management System")
+        self.print("--------------------------------------------")
+        while True:
+            c = (await self.input("\nEnter 'l' to login 'e' to exit : ")).strip()
+            if c == "l":
+                await self.login()
+                await self.run_menu()
+            elif c == "e":
+                self.print(info_box("Good Bye :)"))
+                return
+            else:
+                self.print(info_box("Invalid choice"))
+
+    async def run_menu(self):
+        commands = {
+            "vm": self.view_mine,
+            "ud": self.upcoming_deadlines,
+            "st": self.search_for_tasks,
+            "lo": self.logout,
+        }
+        if self.user == "admin":
+            commands.update(
+                {
+                    "r": self.reg_user,
+                    "vu": self.view_users,
+                    "du": self.delete_user,
+                    "a": self.add_task,
+                    "va": self.view_all,
+                    "gr": self.gen_reports,
+                    "ds": self.display_stats,
+                }
+            )
+        while self.user is not None:
+            choice = (await self.input(view_main_menu(self.user))).strip().lower()
+            choice, *options = choice.split() or [""]
+            args = get_command_options(choice, options)
+            command = commands.get(choice)
+            if command is None or args == -1:
+                self.print(info_box("Invalid choice"))
+                continue
+            if args is None:
+                await command()
+            else:
+                await command(args)
+
+    async def login(self):
+        while True:
+            self.print("LOGIN")
+            curr_user = (await self.input("Username: ")).strip()
+            curr_pass = (await self.input("Password: ")).strip()
+            error = check_login(self.store.user_list, curr_user, curr_pass)
+            if error is None:
+                self.print(info_box("Login Successful!"))
+                self.user = curr_user
+                return
+            self.print(info_box(error))
+
+    async def logout(self):
+        # the writer saves the changes, there is nothing left to save here
+        self.print(info_box(f"Logged out as {self.user}"))
+        self.user = None
+
+    async def reg_user(self):
+        new_user = await self.input_user("New Username: ", False)
+        while True:
+            new_password = (await self.input("New Password: ")).strip()
+            confirm_password = (await self.input("Confirm Password: ")).strip()
+            if new_password == confirm_password:
+                break
+            self.print(info_box("Passwords do no match"))
+        # another session may have registered the name while this one was waiting
+        error = validate_user(new_user, self.store.user_list, False)
+        if error is not None:
+            self.print(info_box(error))
+            return
+        self.store.set_users(
+            register_user(self.store.user_list, new_user, new_password)
+        )
+        self.print(info_box(f"You have successfully registered {new_user}"))
+
+    async def delete_user(self):
+        user = await self.input_user("Name of user to delete :")
+        if user_has_open_tasks(self.store.task_stats, user):
+            self.print(info_box("This user has tasks assign, cannot delete"))
+            return
+        self.print(info_box(f"Are you sure you want to delete {user} ? "))
+        confirm = (await self.input("Type 'yes' to confirm :")).strip()
+        if confirm != "yes":
+            return
+        # checked again as tasks may have been assigned while waiting
+        if user not in self.store.user_list or user_has_open_tasks(
+            self.store.task_stats, user
+        ):
+            self.print(info_box(f"{user} has changed and was not deleted"))
+            return
+        self.store.set_users(unregister_user(self.store.user_list, user))
+        self.print(info_box(f"You have deleted {user}"))
+
+    async def add_task(self):
+        task_username = await self.input_user("Name of person assigned to task :")
+        task_title = await self.input_text("Title of task: ")
+        task_description = await self.input_text("Description of task: ")
+        due_date_time = await self.input_due_date()
+        if task_username not in self.store.user_list:
+            self.print(info_box("User does not exist."))
+            return
+        self.store.add_task(
+            make_task(
+                task_username,
+                task_title,
+                task_description,
+                due_date_time,
+                datetime.today(),
+            )
+        )
+        self.print(info_box(f"New task assigned to {task_username}"))
+
+    async def view_users(self):
+        view_users(self.store.user_list, self)
+
+    async def view_all(self, page):
+        store = self.store
+        offset, limit = page
+        archived = []
+        # the archive is only read if the page reaches the archived tasks
+        if store.task_stats["archived"] and offset + limit > len(store.task_list):
+            archived = await store.run_storage(store.storage.read_tasks_archive)
+        view_all(
+            store.task_list,
+            get_task,
+            info_box,
+            offset,
+            limit,
+            self,
+            store.task_stats["archived"],
+            lambda: archived,
+        )
+
+    async def upcoming_deadlines(self, page):
+        upcoming_deadlines(
+            self.store.task_list, self.user, self.store.task_stats, page, self
+        )
+
+    async def search_for_tasks(self, search):
+        search_for_tasks(
+            self.store.task_list, self.user, self.store.task_stats, search, self
+        )
+
+    async def view_mine(self, page):
+        store = self.store
+        task_list = store.task_list
+        stats = store.task_stats
+        total, user_tasks = get_user_tasks(task_list, stats, self.user, *page)
+        if not total:
+            self.print(info_box("You don't have any tasks"))
+            return
+        view_my_tasks(user_tasks, total, get_task, page[0], out=self)
+        task_number = await self.input_int(
+            "Enter number of task to select or -1 for main menu: "
+        )
+        if task_number == -1:
+            return
+        error = validate_task_number(task_number, total)
+        if error is not None:
+            self.print(info_box(error))
+            return
+        # the task numbers are those shown only while no session has changed the tasks
+        if store.task_list is not task_list:
+            self.print(info_box("The tasks were changed by another user. Try again"))
+            return
+        task = get_user_tasks(task_list, stats, self.user, task_number - 1, 1)[1][0]
+        view_task(task, self)
+        edited_task = await self.edit_my_task(task)
+        if edited_task is None:
+            return
+        if self.store.replace_task(task["idx_num"], task["task_info"], edited_task):
+            self.print(info_box(get_edited_message(edited_task)))
+        else:
+            self.print(info_box("The task was changed by another user. Please try again"))
+
+    async def edit_my_task(self, task):
+        # dates are immutable so a shallow copy is enough
+        task_copy = task["task_info"].copy()
+        choice = (await self.input(view_task_menu())).strip().lower()
+        if choice == "mc":
+            task_copy["completed"] = True
+        elif choice == "et":
+            selected = await self.input(view_edit_task_menu())
+            if selected == "cu":
+                task_copy["username"] = await self.input_user("New user for this task :")
+            elif selected == "cd":
+                task_copy["due_date"] = await self.input_due_date()
+            else:
+                return None
+        else:
+            return None
+        return task_copy
+
+    async def gen_reports(self):
+        store = self.store
+        fingerprint = get_report_fingerprint(store.task_stats, store.user_list)
+        task_report, user_report = get_current_reports(store.task_stats, store.user_list)
+        if task_report == -1:
+            self.print(info_box("Cannot generate any reports. No tasks are available"))
+            return
+        saved = await store.run_storage(write_reports, fingerprint, task_report, user_report)
+        if not saved:
+            self.print(info_box("Reports are already up to date"))
+
+    async def display_stats(self):
+        task_report, user_report = get_current_reports(
+            self.store.task_stats, self.store.user_list
+        )
+        view_stats(task_report, user_report, info_box, self)
+
+
+def write_reports(fingerprint, task_report, user_report):
+    """
+    saves the reports unless the saved reports have the same fingerprint.
+    returns: boolean - True if the reports were written.
+    """
+    if fingerprint == file_access.read_report_fingerprint_file():
+        return False
+    file_access.write_task_overview_file(task_report)
+    file_access.write_user_overview_file(user_report)
+    file_access.write_report_fingerprint_file(fingerprint)
+    return True
+
+
+async def serve(store, host=None, port=None, unix_path=None):
+    """
+    runs the server until it is stopped, then saves the last changes.
+    param: store - the TaskStore.
+    param: host, port - the TCP address, used if unix_path is None.
+    param: unix_path - the path of a Unix socket.
+    """
+
+    async def handle(reader, writer):
+        session = Session(store, reader, writer)
+        try:
+            await session.run()
+            await writer.drain()
+        except (SessionClosed, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # the server is stopping. the session ends normally, its changes are in the store
+            session.print(info_box("The server is shutting down"))
+        except Exception as e:
+            print(f"Session error: {e!r}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    await store.load()
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(handle, path=unix_path)
+    else:
+        server = await asyncio.start_server(handle, host, port)
+    # ctrl-c or a SIGTERM stop the server, where the platform supports signal handlers
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    writer_task = asyncio.create_task(store.run_writer())
+    print(f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        if await store.stop_writer(writer_task):
+            print("Server stopped. All changes saved")
+        else:
+            print("Server stopped. Some changes could not be saved")
+
+
+def main(argv):
+    """
+    param: argv - the command line arguments.
+    returns: the exit status.
+    """
+    parser = argparse.ArgumentParser(description="DO-IT-NOW! Task Management server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead")
+    parser.add_argument("--storage", choices=STORAGE_BACKENDS, default="files")
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=FLUSH_INTERVAL,
+        help="seconds between saves of the waiting changes",
+    )
+    parser.add_argument(
+        "--flush-size",
+        type=int,
+        default=FLUSH_SIZE,
+        help="number of changed tasks that are saved straight away",
+    )
+    args = parser.parse_args(argv)
+
+    async def run():
+        store = TaskStore(
+            STORAGE_BACKENDS[args.storage], args.flush_interval, args.flush_size
+        )
+        await serve(store, args.host, args.port, args.unix)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
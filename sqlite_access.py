@@ -0,0 +1,305 @@
+"""SQLite storage for users and tasks.
+Provides the same read/write functions as file_access.py so either module
+can be passed to task_manager() as the storage backend.
+Each task is stored as a row keyed by its index in the task_list, so saving
+a changed task is a single row write. The task_overview.txt and
+user_overview.txt reports are still text files.
+"""
+
+import sqlite3
+import sys
+import threading
+from datetime import date
+
+import file_access
+from task_store import Task, load_text, replay_journal
+
+DB_PATH = "txt_files/tasks.db"
+
+# changes are written as soon as they are made so the report queries are current
+SAVE_EACH_CHANGE = True
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_ordinal INTEGER NOT NULL,
+    assigned_ordinal INTEGER NOT NULL,
+    completed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_username ON tasks (username);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed_due ON tasks (completed, due_ordinal);
+"""
+
+# a sqlite3 connection can only be used by the thread that opened it, and the
+# tasks are loaded on a setup thread, so every thread opens its own
+_connections = threading.local()
+
+
+def get_connection():
+    """
+    opens tasks.db and creates the tables and indexes if they don't exist.
+    the connection is opened once for each thread and reused.
+    returns: the database connection of the current thread.
+    """
+    connection = getattr(_connections, "connection", None)
+    if connection is None:
+        connection = _connections.connection = sqlite3.connect(DB_PATH)
+        connection.executescript(SCHEMA)
+    return connection
+
+
+def _task_row(idx, task):
+    return (
+        idx,
+        task.username,
+        task.title,
+        task.description,
+        task.due_ordinal,
+        task.assigned_ordinal,
+        int(task.completed),
+    )
+
+
+# *********************************TASKS************************************#
+
+
+def read_tasks_file():
+    """
+    reads every task from tasks.db in task_list order.
+    if there is an exception an error message is displayed and the program terminates.
+    returns: an iterator of task objects.
+    """
+    try:
+        cursor = get_connection().execute(
+            "SELECT username, title, description, due_ordinal, assigned_ordinal,"
+            " completed FROM tasks ORDER BY id"
+        )
+    except sqlite3.Error:
+        print("Fatal error opening database: 'tasks.db'")
+        sys.exit(1)
+    return (
+        Task(
+            sys.intern(username),
+            load_text(title),
+            load_text(description),
+            due,
+            assigned,
+            completed == 1,
+        )
+        for username, title, description, due, assigned, completed in cursor
+    )
+
+
+def write_tasks_file(task_list):
+    """
+    replaces every task in tasks.db with the task_list.
+    if there is an exception an error message is displayed.
+    param: task_list - list of task objects.
+    returns: boolean - True if the tasks were written.
+    """
+    try:
+        with get_connection() as conn:
+            conn.execute("DELETE FROM tasks")
+            conn.executemany(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_task_row(idx, task) for idx, task in enumerate(task_list)),
+            )
+        return True
+    except sqlite3.Error:
+        print("Error writing database: 'tasks.db'")
+        return False
+
+
+def read_tasks_journal():
+    """
+    changes are written straight to tasks.db so there is never a journal to replay.
+    returns: an empty list.
+    """
+    return []
+
+
+def append_tasks_journal(task_list, task_changes, saved_task_list=None):
+    """
+    writes each changed task to its own row in one transaction.
+    a completed task only updates the completed column.
+    if there is an exception an error message is displayed.
+    param: task_list - list of task objects.
+    param: task_changes - dict of task index to change type ("a", "u" or "c").
+    param: saved_task_list - unused, each row is written whole.
+    returns: boolean - True if the changes were written.
+    """
+    try:
+        with get_connection() as conn:
+            for idx in sorted(task_changes):
+                if task_changes[idx] == "c":
+                    conn.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (idx,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        _task_row(idx, task_list[idx]),
+                    )
+        return True
+    except sqlite3.Error:
+        print("Error writing database: 'tasks.db'")
+        return False
+
+
+def tasks_journal_needs_compaction():
+    """
+    returns: False. tasks.db is never compacted.
+    """
+    return False
+
+
+def compact_tasks_file(task_list):
+    """
+    writes the full task list to tasks.db.
+    param: task_list - list of task objects.
+    returns: boolean - True if the tasks were written.
+    """
+    return write_tasks_file(task_list)
+
+
+# *********************************ARCHIVE**********************************#
+
+
+"""
+tasks.db keeps every task, a completed row is never read unless it is needed,
+so nothing is archived.
+"""
+
+
+def read_archive_counts():
+    """
+    returns: an empty dict, no tasks are archived.
+    """
+    return {}
+
+
+def read_tasks_archive():
+    """
+    returns: an empty list, no tasks are archived.
+    """
+    return []
+
+
+def archive_tasks(task_list, archived_tasks):
+    """
+    param: task_list - list of the task objects which stay in tasks.db.
+    param: archived_tasks - list of the task objects to archive.
+    returns: False, the tasks stay in tasks.db.
+    """
+    return False
+
+
+# *********************************USERS************************************#
+
+
+def read_users_file():
+    """
+    reads every user from tasks.db in registration order.
+    the admin user is created if there are no users.
+    if there is an exception an error message is displayed and the program terminates.
+    returns: a list of username;password strings, the same as users.txt.
+    """
+    try:
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT username, password FROM users ORDER BY rowid"
+        ).fetchall()
+        if not rows:
+            with conn:
+                conn.execute("INSERT INTO users VALUES ('admin', 'password')")
+            rows = [("admin", "password")]
+    except sqlite3.Error:
+        print("Fatal error opening database: 'tasks.db'")
+        sys.exit(1)
+    return [f"{username};{password}" for username, password in rows]
+
+
+def write_users_file(user_list):
+    """
+    replaces every user in tasks.db with the user_list.
+    if there is an exception an error message is displayed.
+    param: user_list - dict of objects keyed by username. each object is the user data.
+    returns: boolean - True if the users were written.
+    """
+    try:
+        with get_connection() as conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users VALUES (?, ?)",
+                ((u["username"], u["password"]) for u in user_list.values()),
+            )
+        return True
+    except sqlite3.Error:
+        print("Error writing database: 'tasks.db'")
+        return False
+
+
+# ********************************REPORTS***********************************#
+
+
+def read_report_data(task_list, user_list):
+    """
+    calculates the same statistics as get_report_data with indexed queries.
+    param: task_list - not used, the tasks are read from tasks.db.
+    param: user_list - dict of user objects keyed by username.
+    returns: (all_task_data, user_task_data).
+             all_task_data - [num_tasks, num_completed, num_incomplete, num_overdue].
+             user_task_data - dict of username to [num_tasks, num_completed, num_incomplete, num_overdue].
+    """
+    today_ordinal = date.today().toordinal()
+    conn = get_connection()
+    all_task_data = [0, 0, 0, 0]
+    user_task_data = {username: [0, 0, 0, 0] for username in user_list}
+    for username, num_tasks, num_completed in conn.execute(
+        "SELECT username, COUNT(*), SUM(completed) FROM tasks GROUP BY username"
+    ):
+        counts = user_task_data.get(username, [0, 0, 0, 0])
+        counts[0:3] = [num_tasks, num_completed, num_tasks - num_completed]
+        for i in range(3):
+            all_task_data[i] += counts[i]
+    for username, num_overdue in conn.execute(
+        "SELECT username, COUNT(*) FROM tasks WHERE completed = 0 AND due_ordinal < ?"
+        " GROUP BY username",
+        (today_ordinal,),
+    ):
+        if username in user_task_data:
+            user_task_data[username][3] = num_overdue
+        all_task_data[3] += num_overdue
+    return all_task_data, user_task_data
+
+
+# ********************************MIGRATION*********************************#
+
+
+def migrate_txt_files():
+    """
+    imports users.txt and the stored tasks, with the journal folded in, into tasks.db.
+    the archived tasks are imported too, after the other tasks so those keep their
+    numbers, as tasks.db has no archive.
+    any users and tasks already in tasks.db are replaced.
+    the text files are left in place.
+    returns: (number of users, number of tasks).
+    """
+    user_lines = file_access.read_users_file()
+    task_list = list(
+        replay_journal(file_access.read_tasks_file(), file_access.read_tasks_journal())
+    )
+    task_list += file_access.read_tasks_archive()
+    user_list = {}
+    for u_str in user_lines:
+        username, password = u_str.split(";")
+        user_list[username] = {"username": username, "password": password}
+    write_users_file(user_list)
+    write_tasks_file(task_list)
+    return len(user_list), len(task_list)
+
@@ -1,24 +1,76 @@
 """This is the main module for a task management program.
 file_access.py - contains all functions for file access.
+sqlite_access.py - the same functions storing users and tasks in SQLite.
 views.py - contains the main functions responsible for output. 
 txt_files folder - contains all the generated text files. 
 I really enjoyed this assignment and took the liberty of 
 adding a few additional features. 
+python3 task_manager.py --storage sqlite uses the SQLite storage.
+python3 task_manager.py --analytics numpy calculates the reports with NumPy.
+python3 task_manager.py --analytics parallel reads tasks.txt in shards on every core for the reports.
+python3 task_manager.py --metrics prints the time and memory used by each command at logout.
+write_behind.py - saves the changes every few seconds while the program runs.
+The data files are loaded in the background while the first prompt is shown, and
+the module can be imported without starting the program. Once installed with
+pip install . the program is started with the task-manager command.
 """
 
-import copy
+import argparse
+import atexit
+import gc
+import sys
+import threading
 from datetime import datetime, date
+
+import analytics
+import file_access
+import report_shards
+import sqlite_access
 from file_access import (
-    read_users_file,
-    write_users_file,
-    read_tasks_file,
-    write_tasks_file,
-    read_task_overview_file,
     write_task_overview_file,
-    read_user_overview_file,
     write_user_overview_file,
+    read_report_fingerprint_file,
+    write_report_fingerprint_file,
 )
 
+from metrics import (
+    add_counters,
+    enable_metrics,
+    metrics_enabled,
+    measure,
+    instrument_module,
+    instrument_input,
+    dump_metrics,
+)
+from task_search import search_tasks
+from task_store import (
+    PersistentList,
+    Task,
+    pool_text,
+    replay_journal,
+    trim_text_pool,
+)
+from report_cache import (
+    get_report_fingerprint,
+    get_cached_reports,
+    cache_reports,
+    count_report_hit,
+    report_cache_info,
+)
+from task_stats import (
+    build_task_stats,
+    add_archived_stats,
+    add_task_stats,
+    remove_task_stats,
+    get_due_tasks,
+    get_open_tasks,
+    get_search_index,
+    get_task_stats,
+    get_user_stats,
+)
+
+from write_behind import WriteBehind
+
 from views import (
     view_main_menu,
     view_task_menu,
@@ -26,108 +78,193 @@ from views import (
     view_users,
     view_all,
     view_my_tasks,
+    view_deadlines,
+    view_search_results,
     view_task,
     view_stats,
 )
 
 
 DATETIME_STRING_FORMAT = "%Y-%m-%d"
+INVALID_DATE_FORMAT = "Invalid datetime format. Please use the format specified"
+STORAGE_BACKENDS = {"files": file_access, "sqlite": sqlite_access}
+MENU_COMMANDS = ("r", "vu", "du", "a", "va", "vm", "ud", "st", "gr", "ds", "lo")
+# tasks displayed by va, vm and ud unless an offset and limit are typed, e.g. va 20 10
+PAGE_SIZE = 10
+PAGED_COMMANDS = ("va", "vm", "ud")
+# ud lists the tasks due from today to this many days ahead
+UPCOMING_DAYS = 7
+# completed tasks due more than this many days ago are moved to the archive
+ARCHIVE_DAYS = 90
+# the storage functions measured when metrics are on
+STORAGE_PREFIXES = ("read_", "write_", "append_", "compact_")
 
 """SETUP CODE"""
 
 
-def populate_task_list(read_tasks_file_cb):
+def iter_task_list(read_tasks_file_cb, read_tasks_journal_cb):
+    """
+    reads the tasks one at a time and yields an object of each task.
+    the changes saved in the journal since the last compaction are applied as the tasks are read.
+    param: read_tasks_file_cb - provides the task objects stored in tasks.txt.
+    param: read_tasks_journal_cb - provides the contents of tasks_journal.txt.
+    returns: a generator of task objects in task_list order.
+    """
+    return replay_journal(read_tasks_file_cb(), read_tasks_journal_cb())
+
+
+def populate_task_list(read_tasks_file_cb, read_tasks_journal_cb):
     """
     reads the contants of tasks.txt. an object of each task is created and stored in a list.
-    param: read_tasks_file_cb - provides the contents of tasks.txt.
-    returns: an array of task objects.
+    the changes saved in the journal since the last compaction are replayed in order.
+    tasks with the same username, title or description share one string.
+    the garbage collector is paused while loading as none of the new objects can form cycles.
+    param: read_tasks_file_cb - provides the task objects stored in tasks.txt.
+    param: read_tasks_journal_cb - provides the contents of tasks_journal.txt.
+    returns: a PersistentList of task objects.
     """
-    output = []
-    for t_str in read_tasks_file_cb():
-        curr_t = {}
-        username, title, description, due_date, asigned_date, completed = t_str.split(
-            ";"
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        task_list = PersistentList.from_iterable(
+            iter_task_list(read_tasks_file_cb, read_tasks_journal_cb)
         )
-        curr_t["username"] = username
-        curr_t["title"] = title
-        curr_t["description"] = description
-        curr_t["due_date"] = datetime.strptime(due_date, DATETIME_STRING_FORMAT)
-        curr_t["assigned_date"] = datetime.strptime(
-            asigned_date, DATETIME_STRING_FORMAT
+    finally:
+        if gc_enabled:
+            gc.enable()
+    # only the titles and descriptions shared by several tasks stay pooled
+    trim_text_pool()
+    return task_list
+
+
+def archive_completed_tasks(task_list, storage):
+    """
+    moves the completed tasks due more than ARCHIVE_DAYS ago to the archive, once
+    they are a tenth of the tasks or the journal would be compacted anyway.
+    the task indexes change, so it is only called before any changes are made.
+    param: task_list - the PersistentList just loaded from the storage.
+    param: storage - the storage backend module.
+    returns: the task_list without the archived tasks, or the same task_list if no
+             tasks were archived.
+    """
+    cutoff = date.today().toordinal() - ARCHIVE_DAYS
+    archived = [t for t in task_list if t.completed and t.due_ordinal < cutoff]
+    if not archived:
+        return task_list
+    compact = storage.tasks_journal_needs_compaction()
+    if len(archived) * 10 < len(task_list) and not compact:
+        return task_list
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        current = PersistentList.from_iterable(
+            task
+            for task in task_list
+            if not (task.completed and task.due_ordinal < cutoff)
         )
-        curr_t["completed"] = True if completed == "Yes" else False
-        output.append(curr_t)
-    return output
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if storage.archive_tasks(current, archived):
+        return current
+    return task_list
 
 
 def populate_user_list(read_users_file_cb):
     """
-    reads the contants of users.txt. an object of user is created and stored in a list.
+    reads the contants of users.txt. an object of user is created and stored in a registry
+    keyed by username so checking if a user exists is a single lookup.
     param: read_users_file_cb - provides the contents of users.txt.
-    returns: an array of user objects.
+    returns: a dict of username to user object, in file order.
     """
-    output = []
+    output = {}
     for u_str in read_users_file_cb():
         curr_u = {}
         username, password = u_str.split(";")
+        # the same string as the username of every task of the user
+        username = sys.intern(username)
         curr_u["username"] = username
         curr_u["password"] = password
-        output.append(curr_u)
+        output[username] = curr_u
     return output
 
 
 """HELPER CODE"""
 
 
-def contains(list, filter_cb):
-    """
-    checks a list for a given condition.
-    param: list - generic list to iterate over.
-    param: filter_cb - function which provides a test the list items
-    returns: boolean - value depends on test passing or failing
-    """
-    for x in list:
-        if filter_cb(x):
-            return True
-    return False
-
-
 def info_box(msg):
     """
     places a box around a string
     param: msg - the message to box
     returns: boxed in string
     """
-    line = ""
-    out_str = ""
-    for x in range(len(msg) + 4):
-        line += "-"
-    out_str += f"\n{line}\n! {msg} !\n{line}"
-    return out_str
+    line = "-" * (len(msg) + 4)
+    return f"\n{line}\n! {msg} !\n{line}"
 
 
-def input_user(msg, users, should_exist=True):
+def validate_user(username, users, should_exist=True):
     """
     checks if the user should be or should not be registered.
     depending on the should_exist paramater.
+    param: username - the username.
+    param: users - dict of user objects keyed by username.
+    param: should exist - flips the logic.
+    returns: None if valid else the error message.
+    """
+    if (username in users) == should_exist:
+        return None
+    if should_exist:
+        return "User does not exist."
+    return "Username already exists"
+
+
+def input_user(msg, users, should_exist=True):
+    """
+    asks for a username until validate_user accepts it.
     param: msg - input instructions.
-    param: users - list of user objects.
+    param: users - dict of user objects keyed by username.
     param: should exist - flips the logic.
     returns: the username.
     """
     valid_user = False
     while not valid_user:
         username = input(msg).strip().lower()
-        if contains(users, lambda x: x["username"] == username) == should_exist:
+        error = validate_user(username, users, should_exist)
+        if error is None:
             valid_user = True
         else:
-            if should_exist:
-                print(info_box("User does not exist."))
-            else:
-                print(info_box("Username already exists"))
+            print(info_box(error))
     return username
 
 
+def validate_text(text):
+    """
+    checks a title or description can be stored. tasks.txt and the journal hold
+    one ; separated record per line, so a ; or a line break would split the record.
+    param: text - the title or description.
+    returns: None if valid else the error message.
+    """
+    if ";" in text:
+        return "Titles and descriptions must not contain ;"
+    if "\n" in text or "\r" in text:
+        return "Titles and descriptions must not contain line breaks"
+    return None
+
+
+def input_text(msg):
+    """
+    asks for a title or description until validate_text accepts it.
+    param: msg - input instructions.
+    returns: the stripped text.
+    """
+    while True:
+        text = input(msg).strip()
+        error = validate_text(text)
+        if error is None:
+            return text
+        print(info_box(error))
+
+
 def input_date():
     """
     ensures the user enters a date in the correct date format.
@@ -139,10 +276,22 @@ def input_date():
             due_date_time = datetime.strptime(task_due_date, DATETIME_STRING_FORMAT)
             break
         except ValueError:
-            print(info_box("Invalid datetime format. Please use the format specified"))
+            print(info_box(INVALID_DATE_FORMAT))
     return due_date_time
 
 
+def validate_due_date(d, today):
+    """
+    checks a due date is after today's date.
+    param: d - the due date.
+    param: today - today's date.
+    returns: None if valid else the error message.
+    """
+    if d <= today:
+        return "Invalid date. Date must be after today's date"
+    return None
+
+
 def check_date(input_date_cb, today):
     """
     ensures the user enters a date in the correct date format and after today's data.
@@ -152,8 +301,9 @@ def check_date(input_date_cb, today):
     """
     d = input_date_cb()
     while True:
-        if d <= today:
-            print(info_box(f"Invalid date. Date must be after today's date"))
+        error = validate_due_date(d, today)
+        if error is not None:
+            print(info_box(error))
             d = input_date_cb()
         else:
             break
@@ -174,6 +324,63 @@ def input_int(msg):
             continue
 
 
+def get_page_options(options):
+    """
+    reads the optional offset and limit typed after a paged command, e.g. "va 20 10".
+    param: options - list of the words typed after the command.
+    returns: (offset, limit) or -1 if the options are not valid.
+    """
+    if len(options) > 2 or not all(option.isdigit() for option in options):
+        return -1
+    values = [int(option) for option in options]
+    offset = values[0] if values else 0
+    limit = values[1] if len(values) > 1 else PAGE_SIZE
+    if limit < 1:
+        return -1
+    return offset, limit
+
+
+def get_search_options(options):
+    """
+    reads the words and filters typed after st, e.g. "st budget report user:sam done:no".
+    the filters are user:<username>, done:yes or done:no and from:<number of matches to skip>.
+    param: options - list of the words typed after the command.
+    returns: dict of the search or -1 if there are no words or a filter is not valid.
+    """
+    search = {"query": [], "username": None, "completed": None, "offset": 0}
+    for option in options:
+        name, _, value = option.partition(":")
+        if name == "user" and value:
+            # usernames are stored in lower case
+            search["username"] = value.lower()
+        elif name == "done" and value in ("yes", "no"):
+            search["completed"] = value == "yes"
+        elif name == "from" and value.isdigit():
+            search["offset"] = int(value)
+        elif name in ("user", "done", "from"):
+            return -1
+        else:
+            search["query"].append(option)
+    if not search["query"]:
+        return -1
+    return search
+
+
+def get_command_options(choice, options):
+    """
+    reads the options typed after a menu command.
+    param: choice - the menu command.
+    param: options - list of the words typed after the command.
+    returns: (offset, limit) for a paged command, the search for st, None for any
+             other command or -1 if the options are not valid.
+    """
+    if choice in PAGED_COMMANDS:
+        return get_page_options(options)
+    if choice == "st":
+        return get_search_options(options)
+    return -1 if options else None
+
+
 def filter_user_tasks(task_list, username):
     """
     filters all tasks down into a list of tasks related to one user.
@@ -186,7 +393,7 @@ def filter_user_tasks(task_list, username):
     filtered_tasks = [
         (idx, task)
         for idx, task in enumerate(task_list)
-        if (task["username"] == username and task["completed"] == False)
+        if (task.username == username and task.completed == False)
     ]
     for task_num, idx_task in enumerate(filtered_tasks, start=1):
         output.append(
@@ -195,6 +402,60 @@ def filter_user_tasks(task_list, username):
     return output
 
 
+def get_user_tasks(task_list, task_stats, username, offset=0, limit=None):
+    """
+    finds a page of the tasks filter_user_tasks lists, from the task statistics,
+    so a page takes time in proportion to its size.
+    param: task_list - list of all task objects.
+    param: task_stats - the task statistics.
+    param: username - the user's name.
+    param: offset - the number of tasks to skip.
+    param: limit - the most tasks to return, or None for every task after the offset.
+    returns: (the number of tasks of the user, list of the tasks on the page in the
+             same format as filter_user_tasks).
+    """
+    total, indexes = get_open_tasks(task_stats, task_list, username, offset, limit)
+    user_tasks = [
+        {"task_num": task_num, "idx_num": idx, "task_info": task_list[idx]}
+        for task_num, idx in enumerate(indexes, start=offset + 1)
+    ]
+    return total, user_tasks
+
+
+def track_task_change(task_changes, idx, old_task, new_task):
+    """
+    records the type of change made to a task so only changed tasks are saved.
+    a copy of task_changes is returned to avoid mutation.
+    param: task_changes - dict of task index to change type ("a", "u" or "c").
+    param: idx - the index number in the main task_list.
+    param: old_task - the task object before the change or None for a new task.
+    param: new_task - the task object after the change.
+    returns: a copy of task_changes.
+    """
+    changes_copy = dict(task_changes)
+    changes_copy[idx] = get_change_type(changes_copy.get(idx), old_task, new_task)
+    return changes_copy
+
+
+def get_change_type(prev_change, old_task, new_task):
+    """
+    param: prev_change - the change type already recorded for the task or None.
+    param: old_task - the task object before the change or None for a new task.
+    param: new_task - the task object after the change.
+    returns: the change type to record, "a", "u" or "c".
+    """
+    if old_task is None or prev_change == "a":
+        return "a"
+    if prev_change == "u":
+        return "u"
+    if new_task["completed"] and all(
+        old_task[k] == new_task[k]
+        for k in ("username", "title", "description", "due_date", "assigned_date")
+    ):
+        return "c"
+    return "u"
+
+
 def get_task(t_num, t):
     """
     creates a task string
@@ -203,15 +464,48 @@ def get_task(t_num, t):
     returns: task string.
     """
     if t_num == "#":
-        task = f"\nTask Completed: {t['completed']}\n"
+        heading = f"\nTask Completed: {t['completed']}\n"
     else:
-        task = f"\nTask Number: {t_num}\n"
-    task += f"Task: \t\t {t['title']}\n"
-    task += f"Assigned to: \t {t['username']}\n"
-    task += f"Date Assigned: \t {t['assigned_date'].strftime(DATETIME_STRING_FORMAT)}\n"
-    task += f"Due Date: \t {t['due_date'].strftime(DATETIME_STRING_FORMAT)}\n"
-    task += f"Task Description: \n {t['description']}\n\n"
-    return task
+        heading = f"\nTask Number: {t_num}\n"
+    return (
+        f"{heading}"
+        f"Task: \t\t {t['title']}\n"
+        f"Assigned to: \t {t['username']}\n"
+        f"Date Assigned: \t {t['assigned_date'].strftime(DATETIME_STRING_FORMAT)}\n"
+        f"Due Date: \t {t['due_date'].strftime(DATETIME_STRING_FORMAT)}\n"
+        f"Task Description: \n {t['description']}\n\n"
+    )
+
+
+def get_report_data(task_list, user_list):
+    """
+    calculates the number of tasks, number of completed tasks, number of uncompleted tasks and
+    the number of tasks overdue for all tasks and for each user in a single pass over the tasks.
+    param: task_list - list of task objects.
+    param: user_list - dict of user objects keyed by username.
+    returns: (all_task_data, user_task_data).
+             all_task_data - [num_tasks, num_completed, num_incomplete, num_overdue].
+             user_task_data - dict of username to [num_tasks, num_completed, num_incomplete, num_overdue].
+    """
+    # a due date before today is overdue
+    today_ordinal = date.today().toordinal()
+    all_task_data = [0, 0, 0, 0]
+    user_task_data = {username: [0, 0, 0, 0] for username in user_list}
+    for task in task_list:
+        # tasks of deleted users only count towards the totals
+        counts = user_task_data.get(task.username, [0, 0, 0, 0])
+        if task.completed:
+            idx = 1
+        else:
+            idx = 3 if task.due_ordinal < today_ordinal else 2
+        counts[0] += 1
+        counts[idx] += 1
+        all_task_data[0] += 1
+        all_task_data[idx] += 1
+    # overdue tasks are also uncompleted tasks
+    for counts in [all_task_data, *user_task_data.values()]:
+        counts[2] += counts[3]
+    return all_task_data, user_task_data
 
 
 def get_task_data(list_of_tasks):
@@ -221,35 +515,17 @@ def get_task_data(list_of_tasks):
     param: list_of_tasks - list of task objects.
     returns: [num_tasks, num_completed, num_incomplete, num_overdue].
     """
-
-    today_date = date.today()
-    output = []
-    if len(list_of_tasks) < 1:
-        return output
-
-    # number of tasks
-    output.append(len(list_of_tasks))
-    # number of completed tasks
-    output.append(len([task for task in list_of_tasks if task["completed"] == True]))
-    # number of uncompleted  tasks
-    output.append(output[0] - output[1])
-    # number of overdue tasks
-    output.append(
-        len(
-            [
-                task
-                for task in list_of_tasks
-                if task["completed"] == False and today_date > task["due_date"].date()
-            ]
-        )
-    )
-    return output
+    all_task_data = get_report_data(list_of_tasks, [])[0]
+    if all_task_data[0] < 1:
+        return []
+    return all_task_data
 
 
 def format_task_stats(task_stats):
     """
-    formats a string of task statistics and writes to task_overview.txt.
+    formats a string of task statistics for task_overview.txt.
     param: task_stats - a list containing the task statistics.
+    returns: the task report.
     """
     out_str = ""
     out_str += "\n-----------------TASK STATS-------------------\n"
@@ -260,36 +536,196 @@ def format_task_stats(task_stats):
     out_str += f"The percentage of incomeplete tasks -   {task_stats[4]}%\n"
     out_str += f"The percentage of overdue tasks -       {task_stats[5]}%\n"
     out_str += "-----------------------------------------------\n"
-
-    """write to file here"""
-    write_task_overview_file(out_str)
+    return out_str
 
 
 def format_user_stats(user_stats):
     """
-    formats a string of user statistics and writes to user_overview.txt.
+    formats a string of user statistics for user_overview.txt.
     param: user_stats - a list containing the user statistics.
+    returns: the user report.
     """
-    out_str = ""
     # for the heading
     g_stats = user_stats[:2]
-    out_str += "\n-----------------USER STATS--------------------\n"
-    out_str += f"The total number of users -             {g_stats[0]}\n"
-    out_str += f"The total number of tasks -             {g_stats[1]}\n\n"
+    parts = [
+        "\n-----------------USER STATS--------------------\n"
+        f"The total number of users -             {g_stats[0]}\n"
+        f"The total number of tasks -             {g_stats[1]}\n\n"
+    ]
     # for each user
     u_stats = user_stats[2:]
     for sl in u_stats:
-        out_str += "-----------------------------------------------\n"
-        out_str += f"                 {sl[0]}\n".upper()
-        out_str += f"Number of tasks assigned -              {sl[1]}\n"
-        out_str += f"The percentage of tasks assigned -      {sl[5]}%\n"
-        out_str += f"The percentage of completed tasks -     {sl[6]}%\n"
-        out_str += f"The percentage of uncompleted tasks -   {sl[7]}%\n"
-        out_str += f"The percentage of overdue tasks -       {sl[8]}%\n"
-        out_str += "-----------------------------------------------\n"
+        parts.append(
+            "-----------------------------------------------\n"
+            + f"                 {sl[0]}\n".upper()
+            + f"Number of tasks assigned -              {sl[1]}\n"
+            f"The percentage of tasks assigned -      {sl[5]}%\n"
+            f"The percentage of completed tasks -     {sl[6]}%\n"
+            f"The percentage of uncompleted tasks -   {sl[7]}%\n"
+            f"The percentage of overdue tasks -       {sl[8]}%\n"
+            "-----------------------------------------------\n"
+        )
+    return "".join(parts)
+
+
+def get_reports(all_task_data, user_task_data, user_list):
+    """
+    works out the percentages and formats the task and user reports.
+    param: all_task_data - [num_tasks, num_completed, num_incomplete, num_overdue].
+    param: user_task_data - dict of username to [num_tasks, num_completed, num_incomplete, num_overdue].
+    param: user_list - dict of user objects keyed by username.
+    returns: (task report, user report) or (-1, -1) if there are no tasks.
+    """
+    if not all_task_data[0]:
+        return -1, -1
+
+    """for task_overview.txt"""
+    all_task_data = list(all_task_data)
+    # pct incomplete
+    all_task_data.append(round((all_task_data[2] / all_task_data[0]) * 100))
+    # pct overdue
+    all_task_data.append(round((all_task_data[3] / all_task_data[0]) * 100))
+
+    """for user_overview.txt"""
+    all_user_data = []
+    all_user_data.append(len(user_list))
+    all_user_data.append(all_task_data[0])
+    for username in user_list:
+        # the task counts for the user
+        user_data = [username, *user_task_data[username]]
+        if user_data[1] > 0:
+            # pct assigned
+            user_data.append(round((user_data[1] / all_task_data[0]) * 100))
+            # pct complete
+            user_data.append(round((user_data[2] / all_task_data[0]) * 100))
+            # pct incomplete
+            user_data.append(round((user_data[3] / all_task_data[0]) * 100))
+            # pct overduer
+            user_data.append(round((user_data[4] / all_task_data[0]) * 100))
+            all_user_data.append(user_data)
+
+    # creates a readable format
+    return format_task_stats(all_task_data), format_user_stats(all_user_data)
+
+
+"""USER AND TASK CHANGES"""
+# shared by the prompts below and the sessions of server.py
+
+
+def check_login(user_list, username, password):
+    """
+    checks a username and password.
+    param: user_list - a dict of user objects keyed by username.
+    param: username - the username entered.
+    param: password - the password entered.
+    returns: None if valid else the error message.
+    """
+    user_obj = user_list.get(username)
+    if user_obj is None:
+        return "User does not exist"
+    if user_obj["password"] != password:
+        return "Wrong password"
+    return None
 
-    """write to file here"""
-    write_user_overview_file(out_str)
+
+def register_user(user_list, username, password):
+    """
+    a new user_list is return to avoid mutation. the user objects are shared, not copied.
+    param: user_list - a dict of user objects keyed by username.
+    param: username - the new username.
+    param: password - the new password.
+    returns: a copy of the user_list with the new user.
+    """
+    user_obj = {"username": username, "password": password}
+    return {**user_list, username: user_obj}
+
+
+def unregister_user(user_list, username):
+    """
+    a new user_list is return to avoid mutation. the user objects are shared, not copied.
+    param: user_list - a dict of user objects keyed by username.
+    param: username - the user to delete.
+    returns: a copy of the user_list without the user.
+    """
+    user_copy = dict(user_list)
+    del user_copy[username]
+    return user_copy
+
+
+def user_has_open_tasks(task_stats, username):
+    """
+    a user with uncompleted tasks can't be deleted.
+    param: task_stats - the task statistics.
+    param: username - the user's name.
+    returns: boolean - True if the user has uncompleted tasks.
+    """
+    counts = task_stats["users"].get(username)
+    return counts is not None and counts[2] > 0
+
+
+def make_task(username, title, description, due_date, today):
+    """
+    param: username - the user assigned to the task.
+    param: title, description - the task text.
+    param: due_date - the due date.
+    param: today - today's date, the assigned date.
+    returns: a new uncompleted task object.
+    """
+    return Task(
+        sys.intern(username),
+        pool_text(title),
+        pool_text(description),
+        due_date.toordinal(),
+        today.toordinal(),
+        False,
+    )
+
+
+def append_task(task_list, task_stats, new_task):
+    """
+    the task_list is not mutated. the new list shares every existing task with it.
+    param: task_list - a PersistentList of task objects.
+    param: task_stats - the task statistics, updated in place.
+    param: new_task - the task object to add.
+    returns: a new task_list.
+    """
+    add_task_stats(task_stats, new_task, len(task_list))
+    return task_list.append(new_task)
+
+
+def replace_task(task_list, task_stats, idx, old_task, new_task):
+    """
+    the task_list is not mutated. the new list shares every other task with it.
+    param: task_list - a PersistentList of task objects.
+    param: task_stats - the task statistics, updated in place.
+    param: idx - the index of the task.
+    param: old_task - the task object at idx.
+    param: new_task - the edited task object.
+    returns: a new task_list.
+    """
+    remove_task_stats(task_stats, old_task, idx)
+    add_task_stats(task_stats, new_task, idx)
+    return task_list.set(idx, new_task)
+
+
+def validate_task_number(task_number, num_tasks):
+    """
+    param: task_number - the task number entered, counting from 1.
+    param: num_tasks - the number of tasks listed.
+    returns: None if valid else the error message.
+    """
+    if task_number <= 0 or task_number > num_tasks:
+        return "Not a valid task number"
+    return None
+
+
+def get_edited_message(task):
+    """
+    param: task - the edited task object.
+    returns: the message shown once the task is saved.
+    """
+    done = "marked as complete" if task["completed"] else "edited"
+    return f"Task - {task['title']} - has been {done}"
 
 
 """MAIN CODE"""
@@ -298,31 +734,25 @@ def format_user_stats(user_stats):
 def login(user_list):
     """
     checks if a valid user and password.
-    param: user_list - a list of user objects.
+    param: user_list - a dict of user objects keyed by username.
     returns: name of the user.
     """
-    logged_in = False
-    while not logged_in:
+    while True:
         print("LOGIN")
         curr_user = input("Username: ").strip()
         curr_pass = input("Password: ").strip()
-        if not contains(user_list, lambda x: x["username"] == curr_user):
-            print(info_box("User does not exist"))
-            continue
-        elif not contains(user_list, lambda x: x["password"] == curr_pass):
-            print(info_box("Wrong password"))
-            continue
-        else:
+        error = check_login(user_list, curr_user, curr_pass)
+        if error is None:
             print(info_box("Login Successful!"))
-            logged_in = True
-    return curr_user
+            return curr_user
+        print(info_box(error))
 
 
 def reg_user(user_list):
     """
     registers a new user if not already registered.
-    a copy of user_list is return to avoid mutation.
-    param: user_list - a list of user objects.
+    a new user_list is return to avoid mutation. the user objects are shared, not copied.
+    param: user_list - a dict of user objects keyed by username.
     returns: a copy of the user_list.
     """
     # check the user is not already registered
@@ -335,38 +765,30 @@ def reg_user(user_list):
             passwords_match = True
         else:
             print(info_box("Passwords do no match"))
-    user_obj = {"username": new_user, "password": new_password}
-    # make a copy and append new user
-    user_copy = copy.deepcopy(user_list)
-    user_copy.append(user_obj)
+    # make a new registry with the new user added
+    user_copy = register_user(user_list, new_user, new_password)
     print(info_box(f"You have successfully registered {new_user}"))
     return user_copy
 
 
-def delete_user(user_list, task_list):
+def delete_user(user_list, task_stats):
     """
     deletes a user if no tasks assigned.
-    a copy of user_list is return to avoid mutation.
-    param: user_list - a list of user objects.
-    param: task_list - a list of task objects.
+    a new user_list is return to avoid mutation. the user objects are shared, not copied.
+    param: user_list - a dict of user objects keyed by username.
+    param: task_stats - the task statistics.
     returns: -1 if the user has tasks assigned or no user confirmation
              else returns a copy of the user_list.
     """
     # check the user is registered
     user = input_user("Name of user to delete :", user_list)
     # check if the user has any tasks assigned
-    user_tasks = filter_user_tasks(task_list, user)
-    if len(user_tasks) > 0:
+    if user_has_open_tasks(task_stats, user):
         print(info_box("This user has tasks assign, cannot delete"))
         return -1
     else:
-        # get index number of user
-        index = next(
-            (i for i, item in enumerate(user_list) if item["username"] == user), -1
-        )
-        # make a copy and delete the user
-        user_copy = copy.deepcopy(user_list)
-        del user_copy[index]
+        # make a new registry without the user
+        user_copy = unregister_user(user_list, user)
 
     # no actual deletion is made before user confirmation
     print(info_box(f"Are you sure you want to delete {user} ? "))
@@ -377,31 +799,27 @@ def delete_user(user_list, task_list):
     return -1
 
 
-def add_task(task_list, user_list):
+def add_task(task_list, user_list, task_stats):
     """
     adds a tasks for a registered user.
-    param: task_list - a list of task objects.
-    param: user_list - a list of user objects.
-    returns: a copy of the task_list.
+    the task_list is not mutated. the new list shares every existing task with it.
+    param: task_list - a PersistentList of task objects.
+    param: user_list - a dict of user objects keyed by username.
+    param: task_stats - the task statistics, updated in place.
+    returns: a new task_list.
     """
     # check the user is registered
     task_username = input_user("Name of person assigned to task :", user_list)
-    task_title = input("Title of task: ").strip()
-    task_description = input("Description of task: ").strip()
+    task_title = input_text("Title of task: ")
+    task_description = input_text("Description of task: ")
     curr_date = datetime.today()
     # checks the date entered is after today's date
     due_date_time = check_date(input_date, curr_date)
-    new_task = {
-        "username": task_username,
-        "title": task_title,
-        "description": task_description,
-        "due_date": due_date_time,
-        "assigned_date": curr_date,
-        "completed": False,
-    }
-    # make a copy and append new task
-    task_copy = copy.deepcopy(task_list)
-    task_copy.append(new_task)
+    new_task = make_task(
+        task_username, task_title, task_description, due_date_time, curr_date
+    )
+    # make a new list with the new task appended
+    task_copy = append_task(task_list, task_stats, new_task)
     print(info_box(f"New task assigned to {task_username}"))
     return task_copy
 
@@ -410,18 +828,15 @@ def edit_my_task(task, users):
     """
     allows user to edit certain properties of a task.
     param: task - a task objects.
-    param: users - a list of user objects.
+    param: users - a dict of user objects keyed by username.
     returns: a copy of a task object or -1.
     """
-    task_copy = copy.deepcopy(task["task_info"])
+    # dates are immutable so a shallow copy is enough
+    task_copy = task["task_info"].copy()
     choice = input(view_task_menu()).strip().lower()
     if choice == "mc":
         task_copy["completed"] = True
-        print(
-            info_box(
-                f"Task - {task['task_info']['title']} - has been marked as complete"
-            )
-        )
+        print(info_box(get_edited_message(task_copy)))
     elif choice == "et":
         # if choice == "et" and user == "admin":
         selected = input(view_edit_task_menu())
@@ -433,29 +848,31 @@ def edit_my_task(task, users):
             task_copy["due_date"] = new_date
         elif selected == "e":
             return -1
-        print(info_box(f"Task - {task['task_info']['title']} - has been edited"))
+        print(info_box(get_edited_message(task_copy)))
     elif choice == "e":
         return -1
     return task_copy
 
 
-def view_mine(task_list, user_list, user):
+def view_mine(task_list, user_list, user, task_stats, page=(0, PAGE_SIZE)):
     """
-    allows user to view all assigned tasks and
-    edit a task.
+    allows user to view a page of assigned tasks and
+    edit a task. any task number can be selected, not just those on the page.
     param: task_list - list of task objects.
-    param: user_list - list of user objects.
+    param: user_list - dict of user objects keyed by username.
     param: user - current user.
-    returns: a copy of a task object or -1.
+    param: task_stats - the task statistics, updated in place if a task is edited.
+    param: page - (offset, limit) of the tasks to display, from get_page_options.
+    returns: -1 or a tuple of a copy of the task_list and the index number of the edited task.
     """
-    # get all tasks for the user
-    user_tasks = filter_user_tasks(task_list, user)
+    # get a page of tasks for the user
+    total, user_tasks = get_user_tasks(task_list, task_stats, user, *page)
     # check if any tasks available
-    if not len(user_tasks):
+    if not total:
         print(info_box("You don't have any tasks"))
         return -1
-    # displays all tasks for user
-    view_my_tasks(user_tasks, get_task)
+    # displays a page of tasks for user
+    view_my_tasks(user_tasks, total, get_task, page[0])
 
     # get task number
     task_number = input_int("Enter number of task to select or -1 for main menu: ")
@@ -464,103 +881,193 @@ def view_mine(task_list, user_list, user):
 
     edited_task = {}
     # check if valid task number
-    if task_number <= 0 or task_number > len(user_tasks):
-        print(info_box("Not a valid task number"))
+    error = validate_task_number(task_number, total)
+    if error is not None:
+        print(info_box(error))
         return -1
 
     # display the selected task
-    view_task(user_tasks[task_number - 1])
+    task = get_user_tasks(task_list, task_stats, user, task_number - 1, 1)[1][0]
+    view_task(task)
 
     # edit the selected task
-    edited_task = edit_my_task(user_tasks[task_number - 1], user_list)
+    edited_task = edit_my_task(task, user_list)
 
     # if any edits have been made
     if edited_task != -1:
-        task_copy = copy.deepcopy(task_list)
-        task_copy[user_tasks[task_number - 1]["idx_num"]] = edited_task
-        return task_copy
+        idx_num = task["idx_num"]
+        task_copy = replace_task(
+            task_list, task_stats, idx_num, task["task_info"], edited_task
+        )
+        return task_copy, idx_num
     else:
         return -1
 
 
+def upcoming_deadlines(task_list, user, task_stats, page=(0, PAGE_SIZE), out=None):
+    """
+    displays a page of the uncompleted tasks due in the next UPCOMING_DAYS days.
+    admin sees the tasks of every user, anyone else only their own tasks.
+    param: task_list - list of task objects.
+    param: user - current user.
+    param: task_stats - the task statistics.
+    param: page - (offset, limit) of the tasks to display, from get_page_options.
+    param: out - the writer, defaults to sys.stdout.
+    """
+    username = None if user == "admin" else user
+    if username is None:
+        overdue = get_task_stats(task_stats)[3]
+    else:
+        overdue = get_user_stats(task_stats, {user: None})[user][3]
+    today = date.today().toordinal()
+    total, indexes = get_due_tasks(
+        task_stats, task_list, today, today + UPCOMING_DAYS, username, *page
+    )
+    tasks = [task_list[idx] for idx in indexes]
+    view_deadlines(tasks, total, overdue, UPCOMING_DAYS, info_box, page[0], out)
+
+
+def search_for_tasks(task_list, user, task_stats, search, out=None):
+    """
+    displays a page of the tasks with every word of the search in their title or
+    description. admin searches every task, anyone else only their own tasks.
+    param: task_list - list of task objects.
+    param: user - current user.
+    param: task_stats - the task statistics.
+    param: search - the search from get_search_options.
+    param: out - the writer, defaults to sys.stdout.
+    """
+    username = search["username"] if user == "admin" else user
+    total, indexes = search_tasks(
+        get_search_index(task_stats, task_list),
+        " ".join(search["query"]),
+        username,
+        search["completed"],
+        search["offset"],
+        PAGE_SIZE,
+    )
+    tasks = [task_list[idx] for idx in indexes]
+    view_search_results(tasks, total, search["offset"], get_task, info_box, out)
+
+
 """REPORT CODE"""
 
 
-def gen_reports(task_list, user_list):
+def with_archive_counts(report_data_cb, archive_counts):
+    """
+    adds the archived tasks to the statistics of a report engine, so the reports
+    never read the archive.
+    param: report_data_cb - function like get_report_data.
+    param: archive_counts - dict of username to the number of archived tasks.
+    returns: a function like get_report_data.
+    """
+    if not archive_counts:
+        return report_data_cb
+
+    def report_data(task_list, user_list):
+        all_task_data, user_task_data = report_data_cb(task_list, user_list)
+        all_task_data = list(all_task_data)
+        user_task_data = {username: list(c) for username, c in user_task_data.items()}
+        # archived tasks are all completed
+        for username, count in archive_counts.items():
+            all_task_data[0] += count
+            all_task_data[1] += count
+            if username in user_task_data:
+                user_task_data[username][0] += count
+                user_task_data[username][1] += count
+        return all_task_data, user_task_data
+
+    return report_data
+
+
+def gen_reports(task_list, user_list, report_data_cb=None, fingerprint=None):
     """
     allows user to generate task and user reports and
     save in task_overview.txt and user_overview.txt.
-    param: task_list - list of task objects.
-    param: user_list - list of user objects.
+    nothing is recalculated or written if the saved reports match the fingerprint.
+    param: task_list - list or iterable of task objects, e.g. iter_task_list. it is read once.
+    param: user_list - dict of user objects keyed by username.
+    param: report_data_cb - optional function which consumes the task_list and user_list and returns
+                            the same statistics as get_report_data, e.g. analytics.get_report_data.
+    param: fingerprint - optional fingerprint of the current reports from get_report_fingerprint.
     """
-    if not len(task_list):
+    if fingerprint is not None:
+        if fingerprint == read_report_fingerprint_file():
+            count_report_hit(True)
+            print(info_box("Reports are already up to date"))
+            return
+        cached = get_cached_reports(fingerprint)
+    else:
+        cached = None
+
+    if cached is None:
+        # all_task_data = list[num_tasks, num_completed, num_incomplete, num_overdue]
+        # user_task_data = {username: list[num_tasks, num_completed, num_incomplete, num_overdue]}
+        if report_data_cb is None:
+            report_data_cb = get_report_data
+        all_task_data, user_task_data = report_data_cb(task_list, user_list)
+        task_report, user_report = get_reports(
+            all_task_data, user_task_data, user_list
+        )
+        if fingerprint is not None:
+            cache_reports(fingerprint, task_report, user_report)
+    else:
+        task_report, user_report = cached
+
+    if task_report == -1:
         print(info_box("Cannot generate any reports. No tasks are available"))
         return
+    write_task_overview_file(task_report)
+    write_user_overview_file(user_report)
+    if fingerprint is not None:
+        write_report_fingerprint_file(fingerprint)
 
-    """for task_overview.txt"""
-    # all_task_data = list[num_tasks, num_completed, num_incomplete, num_overdue]
-    all_task_data = get_task_data(task_list)
-
-    # pct incomplete
-    all_task_data.append(round((all_task_data[2] / all_task_data[0]) * 100))
-    # pct overdue
-    all_task_data.append(round((all_task_data[3] / all_task_data[0]) * 100))
-
-    # creates a readable format and writes to task_overview.txt
-    format_task_stats(all_task_data)
-
-    """for user_overview.txt"""
-    all_user_data = []
-    all_user_data.append(len(user_list))
-    all_user_data.append(all_task_data[0])
-    for user in user_list:
-        # get all assigned tasks for user
-        tasks_for_user = [
-            task for task in task_list if task["username"] == user["username"]
-        ]
-        if len(tasks_for_user) > 0:
-            user_task_data = get_task_data(tasks_for_user)
-            user_task_data.insert(0, user["username"])
-            # pct assigned
-            user_task_data.append(round((user_task_data[1] / all_task_data[0]) * 100))
-            # pct complete
-            user_task_data.append(round((user_task_data[2] / all_task_data[0]) * 100))
-            # pct incomplete
-            user_task_data.append(round((user_task_data[3] / all_task_data[0]) * 100))
-            # pct overduer
-            user_task_data.append(round((user_task_data[4] / all_task_data[0]) * 100))
-            all_user_data.append(user_task_data)
 
-    # creates a readable format and writes to user_overview.txt
-    format_user_stats(all_user_data)
+def get_current_reports(task_stats, user_list):
+    """
+    creates the reports from the task statistics.
+    the reports are only formatted again if their fingerprint has changed.
+    param: task_stats - the task statistics.
+    param: user_list - dict of user objects keyed by username.
+    returns: (task report, user report) or (-1, -1) if there are no tasks.
+    """
+    fingerprint = get_report_fingerprint(task_stats, user_list)
+    reports = get_cached_reports(fingerprint)
+    if reports is None:
+        reports = get_reports(
+            get_task_stats(task_stats), get_user_stats(task_stats, user_list), user_list
+        )
+        cache_reports(fingerprint, *reports)
+    return reports
 
 
-def admin_save(user_list, save_users, task_list, save_tasks):
+def admin_save(write_behind, changed):
     """
     called when admin logs out.
-    param: user_list - list of user objects.
-    param: save_users - boolean flag.
-    param: task_list - list of task objects.
-    param: save_tasks - boolean flag.
+    the changes not yet saved by the write-behind timer are saved now.
+    param: write_behind - the WriteBehind holding the unsaved changes.
+    param: changed - boolean flag, True if admin changed any users or tasks.
     """
-    if save_users:
-        write_users_file(user_list)
-    if save_tasks:
-        write_tasks_file(task_list)
-    if save_users or save_tasks:
+    write_behind.flush()
+    if write_behind.failed:
+        print(info_box("Some changes could not be saved"))
+    elif changed:
         print(info_box("All changes saved"))
     print(info_box("Logged out as admin"))
 
 
-def user_save(task_list, save_tasks, user):
+def user_save(write_behind, changed, user):
     """
     called when a user logs out.
-    param: task_list - list of task objects.
-    param: save_tasks - boolean flag.
+    the changes not yet saved by the write-behind timer are saved now.
+    param: write_behind - the WriteBehind holding the unsaved changes.
+    param: changed - boolean flag, True if the user changed any tasks.
     param: user - user logged in.
     """
-    if save_tasks:
-        write_tasks_file(task_list)
+    write_behind.flush()
+    if write_behind.failed:
+        print(info_box("Some changes could not be saved"))
+    elif changed:
         print(info_box("All changes saved"))
     print(info_box(f"Logged out as {user}"))
 
@@ -568,86 +1075,298 @@ def user_save(task_list, save_tasks, user):
 """MAIN FUNCTION"""
 
 
-def task_manager():
+def get_report_engine(storage, engine, task_list):
+    """
+    selects the function which calculates the report statistics.
+    param: storage - the storage backend module.
+    param: engine - "python", "numpy" or "parallel".
+    param: task_list - the task_list just loaded from the storage.
+    returns: a function like get_report_data.
+    """
+    # the storage may aggregate the reports itself
+    if hasattr(storage, "read_report_data"):
+        return storage.read_report_data
+    if engine == "parallel":
+        if storage is file_access and not file_access.tasks_binary_mode():
+            # tasks.txt only matches the task_list if there are no journal entries
+            if storage.read_tasks_journal():
+                task_list = None
+            return report_shards.sharded_report_data(
+                file_access.TASKS_PATH, task_list, get_report_data
+            )
+        print(
+            info_box("Parallel reports need tasks.txt. Reports use the Python engine")
+        )
+    if engine == "numpy":
+        if analytics.numpy_available():
+            return analytics.get_report_data
+        print(info_box("NumPy is not installed. Reports use the Python engine"))
+    return get_report_data
+
+
+def get_stored_report_engine(storage, engine):
+    """
+    selects a report engine which reads the stored tasks itself, so the task_list
+    never has to be loaded for the reports.
+    param: storage - the storage backend module.
+    param: engine - "python", "numpy" or "parallel".
+    returns: a function like get_report_data, or None if the reports need the task_list.
+    """
+    if hasattr(storage, "read_report_data"):
+        return storage.read_report_data
+    # tasks.txt is only the whole task_list if there are no journal entries
+    if (
+        engine == "parallel"
+        and storage is file_access
+        and not file_access.tasks_binary_mode()
+        and not storage.read_tasks_journal()
+    ):
+
+        def report_data(task_list, user_list):
+            return report_shards.read_report_data(file_access.TASKS_PATH, user_list)
+
+        return report_data
+    return None
+
+
+def write_reports(storage, engine):
+    """
+    writes task_overview.txt and user_overview.txt without logging in, e.g. for a
+    scheduled job. with --storage sqlite, or --analytics parallel while tasks.txt has
+    no journal entries, the tasks are counted where they are stored and not loaded.
+    param: storage - the storage backend module.
+    param: engine - "python", "numpy" or "parallel".
+    """
+    user_list = populate_user_list(storage.read_users_file)
+    task_list = None
+    report_data_cb = get_stored_report_engine(storage, engine)
+    if report_data_cb is None:
+        task_list = populate_task_list(
+            storage.read_tasks_file, storage.read_tasks_journal
+        )
+        report_data_cb = get_report_engine(storage, engine, task_list)
+    report_data_cb = with_archive_counts(report_data_cb, storage.read_archive_counts())
+    gen_reports(task_list, user_list, report_data_cb)
+
+
+def load_task_data(storage):
+    """
+    reads the users and tasks, moving old completed tasks to the archive and
+    compacting the journal when they are due.
+    param: storage - the storage backend module.
+    returns: (user_list, task_list, archive_counts).
+    """
+    user_list = populate_user_list(storage.read_users_file)
+    task_list = populate_task_list(storage.read_tasks_file, storage.read_tasks_journal)
+    task_list = archive_completed_tasks(task_list, storage)
+    if storage.tasks_journal_needs_compaction():
+        storage.compact_tasks_file(task_list)
+    return user_list, task_list, storage.read_archive_counts()
+
+
+def start_setup(storage, engine):
+    """
+    loads the data and builds the task stats in a background thread, so the first
+    prompt is shown straight away however large the data is.
+    with metrics on, the setup is done before it returns so the time spent waiting
+    at the prompt is not taken from the setup measurements.
+    param: storage - the storage backend module.
+    param: engine - the report engine name, see get_report_engine.
+    returns: function which waits for the setup and returns
+             (user_list, task_list, task_stats, report_data_cb, write_behind).
+    """
+    result = {}
+
+    def setup():
+        try:
+            with measure("setup"):
+                user_list, task_list, archive_counts = load_task_data(storage)
+                report_data_cb = with_archive_counts(
+                    get_report_engine(storage, engine, task_list), archive_counts
+                )
+                # kept up to date by add_task and view_mine for ds
+                task_stats = build_task_stats(task_list)
+                add_archived_stats(task_stats, archive_counts)
+                # built here so the first st does not wait for it
+                get_search_index(task_stats, task_list)
+                # saves the changes every few seconds, and whatever is left at exit
+                write_behind = WriteBehind(storage, task_list)
+                atexit.register(write_behind.flush)
+            result["data"] = (
+                user_list,
+                task_list,
+                task_stats,
+                report_data_cb,
+                write_behind,
+            )
+        except BaseException as e:
+            # e.g. the SystemExit of a file that can't be read, raised again by wait
+            result["error"] = e
+
+    # not a daemon, so exiting at the first prompt waits for the archive and
+    # compaction to finish writing
+    thread = threading.Thread(target=setup, name="setup")
+    if metrics_enabled():
+        setup()
+    else:
+        thread.start()
+
+    def wait_for_setup():
+        if thread.ident is not None:
+            thread.join()
+        if "error" in result:
+            raise result["error"]
+        return result["data"]
+
+    return wait_for_setup
+
+
+def task_manager(storage=file_access, engine="python", metrics_out=None):
     """
     main program loop.
+    param: storage - the storage backend module, file_access or sqlite_access.
+    param: engine - the report engine, "python", "numpy" or "parallel".
+    param: metrics_out - None to leave metrics off, "-" to print them at logout,
+                         or the path of a metrics file.
     """
-    user_list = []  # main store for user data
+    user_list = {}  # main store for user data, keyed by username
     task_list = []  # main store for task data
-    save_users = False  # set to true when user_list needs updating
-    save_tasks = False  # set to true when task_list needs updating
+    changed = False  # set to true when the logged in user changes users or tasks
 
-    # setup
-    user_list = populate_user_list(read_users_file)
-    task_list = populate_task_list(read_tasks_file)
+    if metrics_out is not None:
+        enable_metrics(None if metrics_out == "-" else metrics_out)
+        # the report files are always written by file_access
+        for module in (storage, file_access):
+            instrument_module(module, STORAGE_PREFIXES, globals())
+        instrument_input(globals())
+        add_counters("report cache", report_cache_info)
+
+    # setup, finished in the background while the first prompt is shown
+    wait_for_setup = start_setup(storage, engine)
 
     print("\nWelcome to DO-IT-NOW! Task Management System")
     print("--------------------------------------------")
     while True:
         c = input("\nEnter 'l' to login 'e' to exit : ").strip()
         if c == "l":
+            if wait_for_setup is not None:
+                user_list, task_list, task_stats, report_data_cb, write_behind = (
+                    wait_for_setup()
+                )
+                wait_for_setup = None
             user = login(user_list)
 
             logged_in = True
             while logged_in:
                 choice = input(view_main_menu(user)).strip().lower()
-                if user == "admin":
-                    match choice:
-                        case "r":
-                            user_list = reg_user(user_list)
-                            save_users = True
-                        case "vu":
-                            view_users(user_list)
-                        case "du":
-                            result = delete_user(user_list, task_list)
-                            if result != -1:
-                                user_list = result
-                                save_users = True
-                        case "a":
-                            task_list = add_task(task_list, user_list)
-                            save_tasks = True
-                        case "va":
-                            view_all(task_list, get_task, info_box)
-                        case "vm":
-                            result = view_mine(
-                                task_list,
-                                user_list,
-                                user,
-                            )
-                            if result != -1:
-                                task_list = result
-                                save_tasks = True
-                        case "gr":
-                            gen_reports(task_list, user_list)
-                        case "ds":
-                            view_stats(
-                                read_task_overview_file,
-                                read_user_overview_file,
-                                info_box,
-                            )
-                        case "lo":
-                            admin_save(user_list, save_users, task_list, save_tasks)
-                            logged_in = False
-                        case _:
-                            print(info_box("Invalid choice"))
-                            continue
-                else:
-                    match choice:
-                        case "vm":
-                            result = view_mine(
-                                task_list,
-                                user_list,
-                                user,
-                            )
-                            if result != -1:
-                                task_list = result
-                                save_tasks = True
-                        case "lo":
-                            user_save(task_list, save_tasks, user)
-                            logged_in = False
-                        case _:
-                            print(info_box("Invalid choice"))
-                            continue
+                choice, *options = choice.split() or [""]
+                args = get_command_options(choice, options)
+                if args == -1:
+                    choice = "invalid"
+                command = choice if choice in MENU_COMMANDS else "invalid"
+                with measure(f"command {command}"):
+                    if user == "admin":
+                        match choice:
+                            case "r":
+                                user_list = reg_user(user_list)
+                                write_behind.track_users(user_list)
+                                changed = True
+                            case "vu":
+                                view_users(user_list)
+                            case "du":
+                                result = delete_user(user_list, task_stats)
+                                if result != -1:
+                                    user_list = result
+                                    write_behind.track_users(user_list)
+                                    changed = True
+                            case "a":
+                                task_list = add_task(task_list, user_list, task_stats)
+                                write_behind.track_tasks(
+                                    task_list,
+                                    track_task_change(
+                                        {}, len(task_list) - 1, None, task_list[-1]
+                                    ),
+                                )
+                                changed = True
+                            case "va":
+                                view_all(
+                                    task_list,
+                                    get_task,
+                                    info_box,
+                                    *args,
+                                    archived_count=task_stats["archived"],
+                                    archived_cb=storage.read_tasks_archive,
+                                )
+                            case "vm":
+                                result = view_mine(
+                                    task_list,
+                                    user_list,
+                                    user,
+                                    task_stats,
+                                    args,
+                                )
+                                if result != -1:
+                                    new_task_list, idx = result
+                                    task_changes = track_task_change(
+                                        {}, idx, task_list[idx], new_task_list[idx]
+                                    )
+                                    task_list = new_task_list
+                                    write_behind.track_tasks(task_list, task_changes)
+                                    changed = True
+                            case "ud":
+                                upcoming_deadlines(task_list, user, task_stats, args)
+                            case "st":
+                                search_for_tasks(task_list, user, task_stats, args)
+                            case "gr":
+                                gen_reports(
+                                    task_list,
+                                    user_list,
+                                    report_data_cb,
+                                    get_report_fingerprint(task_stats, user_list),
+                                )
+                            case "ds":
+                                task_report, user_report = get_current_reports(
+                                    task_stats, user_list
+                                )
+                                view_stats(task_report, user_report, info_box)
+                            case "lo":
+                                admin_save(write_behind, changed)
+                                changed = False
+                                logged_in = False
+                            case _:
+                                print(info_box("Invalid choice"))
+                                continue
+                    else:
+                        match choice:
+                            case "vm":
+                                result = view_mine(
+                                    task_list,
+                                    user_list,
+                                    user,
+                                    task_stats,
+                                    args,
+                                )
+                                if result != -1:
+                                    new_task_list, idx = result
+                                    task_changes = track_task_change(
+                                        {}, idx, task_list[idx], new_task_list[idx]
+                                    )
+                                    task_list = new_task_list
+                                    write_behind.track_tasks(task_list, task_changes)
+                                    changed = True
+                            case "ud":
+                                upcoming_deadlines(task_list, user, task_stats, args)
+                            case "st":
+                                search_for_tasks(task_list, user, task_stats, args)
+                            case "lo":
+                                user_save(write_behind, changed, user)
+                                changed = False
+                                logged_in = False
+                            case _:
+                                print(info_box("Invalid choice"))
+                                continue
+                if not logged_in:
+                    dump_metrics()
         elif c == "e":
             print(info_box("Good Bye :)"))
             exit()
@@ -655,5 +1374,67 @@ def task_manager():
             print(info_box("Invalid choice"))
 
 
+def parse_args(argv):
+    """
+    reads the storage backend and report engine from the command line arguments.
+    param: argv - the command line arguments.
+    returns: (storage backend module, report engine name, metrics output,
+             True to only write the reports).
+    """
+    parser = argparse.ArgumentParser(description="DO-IT-NOW! Task Management System")
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_BACKENDS,
+        default="files",
+        help="store users and tasks in txt_files/ (default) or txt_files/tasks.db",
+    )
+    parser.add_argument(
+        "--analytics",
+        choices=("python", "numpy", "parallel"),
+        default="python",
+        help="calculate the reports in Python (default), with NumPy if installed"
+        " or from tasks.txt with a process per core",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_const",
+        const="-",
+        dest="metrics_out",
+        help="print the time and memory of each command and storage call at logout",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_out",
+        metavar="PATH",
+        help="write the metrics to a JSON file at logout instead of printing them",
+    )
+    parser.add_argument(
+        "--reports",
+        action="store_true",
+        help="write task_overview.txt and user_overview.txt and exit",
+    )
+    args = parser.parse_args(argv)
+    return (
+        STORAGE_BACKENDS[args.storage],
+        args.analytics,
+        args.metrics_out,
+        args.reports,
+    )
+
+
+def main(argv=None):
+    """
+    starts the program, the entry point of the task-manager command.
+    param: argv - the command line arguments, or None for sys.argv[1:].
+    """
+    storage, engine, metrics_out, reports = parse_args(argv)
+    if reports:
+        write_reports(storage, engine)
+    else:
+        task_manager(storage, engine, metrics_out)
+
+
 """MAIN PROGRAM"""
-task_manager()
+# worker processes for parallel reports may import this module again
+if __name__ == "__main__":
+    main(sys.argv[1:])
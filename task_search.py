@@ -0,0 +1,144 @@
+"""In-memory search over the titles and descriptions of the tasks.
+The search index is an inverted index of every word to the tasks it is in:
+    {word: task index, or array of task indexes in ascending order}
+Most words of a large task list are only in one task, e.g. the numbers in
+titles, so those are kept as a single int instead of an array.
+The username and completion of each task are indexed as the words user:<username>
+and done:yes or done:no, which cannot be typed in a title, so the filters of a
+search are looked up the same way as its words.
+A search only visits the tasks of its rarest word, never the whole task list.
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+
+# words are runs of letters and digits, matched without case
+WORD_PATTERN = re.compile(r"\w+")
+# scanning a postings array in C beats a binary search in Python for each match
+# until the array is this many times longer than the matches
+SCAN_RATIO = 16
+
+
+def get_words(text):
+    """
+    param: text - a title, description or search query.
+    returns: set of the lower case words in the text.
+    """
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def get_task_words(task):
+    """
+    param: task - the task object.
+    returns: set of the words in the title and description, and the username and
+             completion words.
+    """
+    words = get_words(f"{task.title} {task.description}")
+    words.add(f"user:{task.username}")
+    words.add("done:yes" if task.completed else "done:no")
+    return words
+
+
+def build_search_index(task_list):
+    """
+    indexes the words of every task in a single pass.
+    param: task_list - list of task objects.
+    returns: the search index.
+    """
+    index = {}
+    for idx, task in enumerate(task_list):
+        for word in get_task_words(task):
+            postings = index.get(word)
+            if postings is None:
+                index[word] = idx
+            elif type(postings) is int:
+                index[word] = array("I", (postings, idx))
+            else:
+                # the tasks are visited in index order so the arrays stay sorted
+                postings.append(idx)
+    return index
+
+
+def add_search_task(index, task, idx):
+    """
+    indexes the words of a new or edited task.
+    param: index - the search index, updated in place.
+    param: task - the task object.
+    param: idx - the index of the task in the task_list.
+    """
+    for word in get_task_words(task):
+        postings = index.get(word)
+        if postings is None:
+            index[word] = idx
+        elif type(postings) is int:
+            if postings != idx:
+                index[word] = array("I", sorted((postings, idx)))
+        else:
+            pos = bisect_left(postings, idx)
+            if pos == len(postings) or postings[pos] != idx:
+                postings.insert(pos, idx)
+
+
+def remove_search_task(index, task, idx):
+    """
+    stops indexing the words of a task, e.g. the old version of an edited task.
+    param: index - the search index, updated in place.
+    param: task - the task object.
+    param: idx - the index of the task in the task_list.
+    """
+    for word in get_task_words(task):
+        postings = index.get(word)
+        if postings is None:
+            continue
+        if type(postings) is int:
+            if postings == idx:
+                del index[word]
+            continue
+        pos = bisect_left(postings, idx)
+        if pos < len(postings) and postings[pos] == idx:
+            del postings[pos]
+            if len(postings) == 1:
+                index[word] = postings[0]
+
+
+def search_tasks(index, query, username=None, completed=None, offset=0, limit=None):
+    """
+    finds the tasks with every word of the query in their title or description.
+    param: index - the search index.
+    param: query - the words to search for.
+    param: username - only the tasks of this user, or None for every user.
+    param: completed - True or False to only find completed or uncompleted tasks,
+                       or None for both.
+    param: offset - the number of matching tasks to skip.
+    param: limit - the most task indexes to return, or None for every task after the offset.
+    returns: (the number of matching tasks, list of the task indexes in task_list order).
+    """
+    words = get_words(query)
+    if not words:
+        return 0, []
+    if username is not None:
+        words.add(f"user:{username}")
+    if completed is not None:
+        words.add("done:yes" if completed else "done:no")
+    postings_list = []
+    for word in words:
+        postings = index.get(word)
+        if postings is None:
+            return 0, []
+        postings_list.append((postings,) if type(postings) is int else postings)
+    # every match is in the shortest postings, the others are intersected in turn
+    postings_list.sort(key=len)
+    matches = postings_list[0]
+    for postings in postings_list[1:]:
+        if len(postings) <= len(matches) * SCAN_RATIO:
+            matches = sorted(set(matches).intersection(postings))
+        else:
+            matches = [idx for idx in matches if _contains(postings, idx)]
+    end = None if limit is None else offset + limit
+    return len(matches), list(matches[offset:end])
+
+
+def _contains(postings, idx):
+    pos = bisect_left(postings, idx)
+    return pos < len(postings) and postings[pos] == idx
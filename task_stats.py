@@ -0,0 +1,282 @@
+"""Task statistics kept up to date as tasks change.
+The statistics are a dict so they can be updated in place by the functions
+that change tasks:
+    {
+        "today": ordinal of the day the overdue counts were worked out for,
+        "all": [num_tasks, num_completed, num_incomplete, num_overdue],
+        "users": {username: [num_tasks, num_completed, num_incomplete, num_overdue]},
+        "due": {username: {due date ordinal: number of uncompleted tasks}},
+        "deadlines": None or {"all": keys, "users": {username: keys}},
+        "open": None or {username: indexes of the uncompleted tasks in index order},
+        "search": None or the search index of task_search.py,
+        "archived": number of archived tasks, counted in "all" and "users",
+    }
+Every task is counted under its username, whether or not the user is still
+registered, which matches gen_reports. Archived tasks are counted as completed
+tasks from the archive counts, see add_archived_stats.
+The deadlines are the uncompleted tasks in due date order, so the tasks due
+between two dates are found with a binary search. They are only built the
+first time they are used, see get_deadlines. Each key is the due date ordinal
+and the task index in one int, which sorts by due date then index:
+    due_ordinal << INDEX_BITS | task index
+The indexes of each user's uncompleted tasks are also built the first time
+they are used, see get_open_tasks, so a page of vm is found without visiting
+the other tasks.
+The search index is built while the program loads the tasks, or the first time
+it is used by any other caller, see get_search_index.
+"""
+
+from bisect import bisect_left, insort
+from datetime import date
+
+from task_search import add_search_task, build_search_index, remove_search_task
+
+INDEX_BITS = 40
+
+
+def build_task_stats(task_list):
+    """
+    works out the statistics for every task in a single pass.
+    param: task_list - list of task objects.
+    returns: the task statistics.
+    """
+    stats = {
+        "today": date.today().toordinal(),
+        "all": [0, 0, 0, 0],
+        "users": {},
+        "due": {},
+        "deadlines": None,
+        "open": None,
+        "search": None,
+        "archived": 0,
+    }
+    for task in task_list:
+        _count_task(stats, task, 1)
+    return stats
+
+
+def add_archived_stats(stats, archive_counts):
+    """
+    counts the archived tasks, which are all completed and never change.
+    param: stats - the task statistics, updated in place.
+    param: archive_counts - dict of username to the number of archived tasks.
+    """
+    all_counts = stats["all"]
+    for username, count in archive_counts.items():
+        counts = stats["users"].get(username)
+        if counts is None:
+            counts = stats["users"][username] = [0, 0, 0, 0]
+            stats["due"][username] = {}
+        counts[0] += count
+        counts[1] += count
+        all_counts[0] += count
+        all_counts[1] += count
+        stats["archived"] += count
+
+
+def add_task_stats(stats, task, idx):
+    """
+    counts a new or edited task.
+    param: stats - the task statistics, updated in place.
+    param: task - the task object.
+    param: idx - the index of the task in the task_list.
+    """
+    roll_task_stats(stats)
+    _count_task(stats, task, 1)
+    _index_task(stats, task, idx, 1)
+    if stats["search"] is not None:
+        add_search_task(stats["search"], task, idx)
+
+
+def remove_task_stats(stats, task, idx):
+    """
+    stops counting a task, e.g. the old version of an edited task.
+    param: stats - the task statistics, updated in place.
+    param: task - the task object.
+    param: idx - the index of the task in the task_list.
+    """
+    roll_task_stats(stats)
+    _count_task(stats, task, -1)
+    _index_task(stats, task, idx, -1)
+    if stats["search"] is not None:
+        remove_search_task(stats["search"], task, idx)
+
+
+def roll_task_stats(stats, today_ordinal=None):
+    """
+    moves the overdue counts forward to today.
+    only the due dates passed since the last roll are visited.
+    param: stats - the task statistics, updated in place.
+    param: today_ordinal - defaults to today.
+    """
+    if today_ordinal is None:
+        today_ordinal = date.today().toordinal()
+    last_ordinal = stats["today"]
+    if today_ordinal == last_ordinal:
+        return
+    all_counts = stats["all"]
+    for username, due_counts in stats["due"].items():
+        if today_ordinal > last_ordinal and today_ordinal - last_ordinal < len(due_counts):
+            newly_overdue = sum(
+                due_counts.get(d, 0) for d in range(last_ordinal, today_ordinal)
+            )
+        else:
+            # a long gap or the clock went back, so count from the due dates
+            newly_overdue = sum(
+                count for d, count in due_counts.items() if d < today_ordinal
+            ) - stats["users"][username][3]
+        stats["users"][username][3] += newly_overdue
+        all_counts[3] += newly_overdue
+    stats["today"] = today_ordinal
+
+
+def get_task_stats(stats):
+    """
+    param: stats - the task statistics.
+    returns: [num_tasks, num_completed, num_incomplete, num_overdue] for all tasks.
+    """
+    roll_task_stats(stats)
+    return list(stats["all"])
+
+
+def get_user_stats(stats, user_list):
+    """
+    param: stats - the task statistics.
+    param: user_list - dict of user objects keyed by username.
+    returns: dict of username to [num_tasks, num_completed, num_incomplete, num_overdue]
+             for every registered user.
+    """
+    roll_task_stats(stats)
+    users = stats["users"]
+    return {
+        username: list(users[username]) if username in users else [0, 0, 0, 0]
+        for username in user_list
+    }
+
+
+def get_deadlines(stats, task_list):
+    """
+    builds the deadlines the first time they are needed.
+    add_task_stats and remove_task_stats keep them up to date after that.
+    param: stats - the task statistics, updated in place.
+    param: task_list - the list of task objects the statistics were built from.
+    returns: {"all": keys, "users": {username: keys}}.
+    """
+    if stats["deadlines"] is None:
+        all_keys = []
+        user_keys = {}
+        for idx, task in enumerate(task_list):
+            if not task.completed:
+                key = task.due_ordinal << INDEX_BITS | idx
+                all_keys.append(key)
+                user_keys.setdefault(task.username, []).append(key)
+        # the tasks are visited in index order so sorting only moves the due dates
+        all_keys.sort()
+        for keys in user_keys.values():
+            keys.sort()
+        stats["deadlines"] = {"all": all_keys, "users": user_keys}
+    return stats["deadlines"]
+
+
+def get_due_tasks(
+    stats, task_list, first_ordinal, last_ordinal, username=None, offset=0, limit=None
+):
+    """
+    finds the uncompleted tasks due from one date to another with a binary search,
+    so the time depends on the number of tasks returned, not the number of tasks.
+    param: stats - the task statistics.
+    param: task_list - the list of task objects.
+    param: first_ordinal - the ordinal of the first due date.
+    param: last_ordinal - the ordinal of the last due date.
+    param: username - only the tasks of this user, or None for every user.
+    param: offset - the number of due tasks to skip.
+    param: limit - the most task indexes to return, or None for every task after the offset.
+    returns: (the number of tasks due, list of the task indexes in due date order).
+    """
+    deadlines = get_deadlines(stats, task_list)
+    if username is None:
+        keys = deadlines["all"]
+    else:
+        keys = deadlines["users"].get(username, [])
+    start = bisect_left(keys, first_ordinal << INDEX_BITS)
+    end = bisect_left(keys, (last_ordinal + 1) << INDEX_BITS)
+    page_start = min(start + offset, end)
+    page_end = end if limit is None else min(page_start + limit, end)
+    mask = (1 << INDEX_BITS) - 1
+    return end - start, [key & mask for key in keys[page_start:page_end]]
+
+
+def get_open_tasks(stats, task_list, username, offset=0, limit=None):
+    """
+    finds a page of the uncompleted tasks of a user, in task_list order.
+    the indexes of every user's tasks are built the first time they are needed,
+    add_task_stats and remove_task_stats keep them up to date after that.
+    param: stats - the task statistics, updated in place.
+    param: task_list - the list of task objects the statistics were built from.
+    param: username - the user's name.
+    param: offset - the number of uncompleted tasks to skip.
+    param: limit - the most task indexes to return, or None for every task after the offset.
+    returns: (the number of uncompleted tasks, list of the task indexes on the page).
+    """
+    if stats["open"] is None:
+        open_tasks = {}
+        for idx, task in enumerate(task_list):
+            if not task.completed:
+                open_tasks.setdefault(task.username, []).append(idx)
+        stats["open"] = open_tasks
+    indexes = stats["open"].get(username, [])
+    return len(indexes), indexes[offset : None if limit is None else offset + limit]
+
+
+def get_search_index(stats, task_list):
+    """
+    builds the search index the first time it is needed.
+    add_task_stats and remove_task_stats keep it up to date after that.
+    param: stats - the task statistics, updated in place.
+    param: task_list - the list of task objects the statistics were built from.
+    returns: the search index.
+    """
+    if stats["search"] is None:
+        stats["search"] = build_search_index(task_list)
+    return stats["search"]
+
+
+def _index_task(stats, task, idx, step):
+    if task.completed:
+        return
+    sorted_lists = []
+    if stats["open"] is not None:
+        sorted_lists.append((stats["open"].setdefault(task.username, []), idx))
+    deadlines = stats["deadlines"]
+    if deadlines is not None:
+        key = task.due_ordinal << INDEX_BITS | idx
+        user_keys = deadlines["users"].setdefault(task.username, [])
+        sorted_lists += [(deadlines["all"], key), (user_keys, key)]
+    for keys, key in sorted_lists:
+        if step > 0:
+            insort(keys, key)
+        else:
+            del keys[bisect_left(keys, key)]
+
+
+def _count_task(stats, task, step):
+    counts = stats["users"].get(task.username)
+    if counts is None:
+        counts = stats["users"][task.username] = [0, 0, 0, 0]
+        stats["due"][task.username] = {}
+    all_counts = stats["all"]
+    counts[0] += step
+    all_counts[0] += step
+    if task.completed:
+        counts[1] += step
+        all_counts[1] += step
+        return
+    counts[2] += step
+    all_counts[2] += step
+    due_counts = stats["due"][task.username]
+    due_counts[task.due_ordinal] = due_counts.get(task.due_ordinal, 0) + step
+    if not due_counts[task.due_ordinal]:
+        del due_counts[task.due_ordinal]
+    if task.due_ordinal < stats["today"]:
+        counts[3] += step
+        all_counts[3] += step
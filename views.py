@@ -1,3 +1,12 @@
+import sys
+from itertools import islice
+
+from task_store import PersistentList
+
+# the number of formatted tasks joined into each write
+WRITE_BATCH_SIZE = 256
+
+
 def view_main_menu(user):
     """
     creates the main menu view.
@@ -11,13 +20,16 @@ def view_main_menu(user):
 
     r -  Register a user       a -  Add a task          gr - Generate reports
     vu - View all users        va - View all tasks      ds - Display statistics
-    du - Delete a user         vm - View my task
+    du - Delete a user         vm - View my task        ud - Upcoming deadlines
+                               st - Search tasks
 
     lo - Logout
     :  """
     else:
         menu = """Select one of the following options below:
     vm - View my task
+    ud - Upcoming deadlines
+    st - Search my tasks
     lo - logout
     :  """
     return menu
@@ -49,48 +61,210 @@ def view_edit_task_menu():
     return menu
 
 
-def view_users(user_list):
+def view_users(user_list, out=None):
     """
     displays a list of user names.
-    param: user_list - list of user objects.
+    param: user_list - dict of user objects keyed by username.
+    param: out - the writer, defaults to sys.stdout.
     """
     user_str = "All registed users\n\n"
-    for user in user_list:
-        user_str += f"    {user['username']}\n"
-    print(user_str)
+    for username in user_list:
+        user_str += f"    {username}\n"
+    print(user_str, file=out)
+
+
+def get_page(items, offset, limit):
+    """
+    param: items - list or PersistentList.
+    param: offset - index of the first item of the page.
+    param: limit - the most items on the page, or None for every item after the offset.
+    returns: an iterable of the items on the page. a PersistentList page is found without
+             reading the items before it, so a page takes time in proportion to its size.
+    """
+    if isinstance(items, PersistentList):
+        return islice(items.iter_from(offset), limit)
+    return items[offset : None if limit is None else offset + limit]
+
+
+def read_page(items, offset, limit):
+    """
+    takes a page from a lazy iterable and counts its items, reading it once.
+    param: items - any iterable, e.g. iter_task_list.
+    param: offset - index of the first item of the page.
+    param: limit - the most items on the page, or None for every item after the offset.
+    returns: (list of the items on the page, the number of items).
+    """
+    items = iter(items)
+    skipped = sum(1 for _ in islice(items, offset))
+    page = list(islice(items, limit))
+    return page, skipped + len(page) + sum(1 for _ in items)
+
+
+def write_pages(strings, out=None):
+    """
+    writes the strings in batches instead of one write per string.
+    param: strings - iterable of strings.
+    param: out - the writer, defaults to sys.stdout.
+    returns: the number of strings written.
+    """
+    out = out or sys.stdout
+    count = 0
+    batch = []
+    for string in strings:
+        batch.append(string)
+        if len(batch) == WRITE_BATCH_SIZE:
+            out.write("".join(batch))
+            count += len(batch)
+            batch = []
+    out.write("".join(batch))
+    return count + len(batch)
+
+
+def view_page_footer(command, offset, shown, total, out=None):
+    """
+    displays which tasks are on the page and how to see the next page.
+    nothing is displayed if every task fits on the page.
+    param: command - the menu command, va or vm.
+    param: offset, shown, total - index of the first task, tasks shown and tasks available.
+    param: out - the writer, defaults to sys.stdout.
+    """
+    if offset == 0 and shown == total:
+        return
+    out = out or sys.stdout
+    if shown == 0:
+        out.write(f"No tasks to display. There are {total} tasks\n")
+        return
+    footer = f"Showing tasks {offset + 1} to {offset + shown} of {total}."
+    if offset + shown < total:
+        footer += f" Type {command} {offset + shown} to see the next page."
+    out.write(footer + "\n")
 
 
-def view_all(task_list, get_task_cb, info_box_cb):
+def view_all(
+    task_list,
+    get_task_cb,
+    info_box_cb,
+    offset=0,
+    limit=None,
+    out=None,
+    archived_count=0,
+    archived_cb=None,
+):
     """
     displays a message if there are no tasks to display else
-    all current tasks are displayed.
-    param: task_list - list of task objects.
+    a page of the current tasks is displayed.
+    the archived tasks are displayed after the current tasks.
+    param: task_list - list, PersistentList or iterable of task objects, e.g.
+                       iter_task_list. an iterable is read once.
     param: get_task_cb - function which consumes the task object returns formatted string.
     param: info_box_cb - function which adds a box around the str argument.
+    param: offset - index of the first task to display.
+    param: limit - the most tasks to display, or None for every task after the offset.
+    param: out - the writer, defaults to sys.stdout.
+    param: archived_count - the number of archived tasks.
+    param: archived_cb - function which returns the list of archived tasks. it is only
+                         called if the page reaches the archived tasks.
     """
-    if not len(task_list):
-        print(info_box_cb("No tasks available"))
-    for task in task_list:
-        print(get_task_cb("#", task))
+    out = out or sys.stdout
+    if hasattr(task_list, "__len__"):
+        num_current = len(task_list)
+        page = get_page(task_list, offset, limit)
+    else:
+        page, num_current = read_page(task_list, offset, limit)
+    total = num_current + archived_count
+    if not total:
+        out.write(info_box_cb("No tasks available") + "\n")
+        return
+    shown = write_pages((get_task_cb("#", task) + "\n" for task in page), out)
+    if archived_count and (limit is None or shown < limit):
+        archived_offset = max(0, offset - num_current)
+        archived_limit = None if limit is None else limit - shown
+        shown += write_pages(
+            (
+                get_task_cb("#", task) + "\n"
+                for task in get_page(archived_cb(), archived_offset, archived_limit)
+            ),
+            out,
+        )
+    view_page_footer("va", offset, shown, total, out)
 
 
-def view_my_tasks(user_tasks, get_task_cb):
+def view_my_tasks(user_tasks, total, get_task_cb, offset=0, out=None):
     """
-    displays all current tasks assigned to the current logged in user.
-    param: user_tasks -  list of task objects. each object only contains task data for the current logged in user.
+    displays a page of the current tasks assigned to the current logged in user.
+    param: user_tasks -  list of the task objects on the page. each object only contains task data for the current logged in user.
+    param: total - the number of tasks of the user.
     param: get_task_cb - function which consumes the task object returns formatted string.
+    param: offset - index of the first task displayed.
+    param: out - the writer, defaults to sys.stdout.
     """
-    task_str = ""
-    for task in user_tasks:
-        task_str += get_task_cb(task["task_num"], task["task_info"])
-    print(task_str)
+    out = out or sys.stdout
+    shown = write_pages(
+        (get_task_cb(task["task_num"], task["task_info"]) for task in user_tasks),
+        out,
+    )
+    out.write("\n")
+    view_page_footer("vm", offset, shown, total, out)
+
+
+def view_deadlines(tasks, total, overdue, days, info_box_cb, offset=0, out=None):
+    """
+    displays a page of the uncompleted tasks due soon, one line per task.
+    param: tasks - list of task objects in due date order.
+    param: total - the number of tasks due soon.
+    param: overdue - the number of overdue tasks.
+    param: days - the number of days ahead the tasks are due in.
+    param: info_box_cb - function which adds a box around the str argument.
+    param: offset - index of the first task displayed.
+    param: out - the writer, defaults to sys.stdout.
+    """
+    out = out or sys.stdout
+    if overdue:
+        out.write(info_box_cb(f"{overdue} tasks are overdue") + "\n")
+    if not total:
+        out.write(info_box_cb(f"No tasks are due in the next {days} days") + "\n")
+        return
+    out.write(f"\nTasks due in the next {days} days\n\n")
+    shown = write_pages(
+        (
+            f"    {task['due_date']:%Y-%m-%d}  {task['username']:<15} {task['title']}\n"
+            for task in tasks
+        ),
+        out,
+    )
+    view_page_footer("ud", offset, shown, total, out)
 
 
-def view_task(task):
+def view_search_results(tasks, total, offset, get_task_cb, info_box_cb, out=None):
+    """
+    displays a page of the tasks found by a search.
+    param: tasks - list of task objects on the page.
+    param: total - the number of tasks found.
+    param: offset - the number of tasks found before the page.
+    param: get_task_cb - function which consumes the task object returns formatted string.
+    param: info_box_cb - function which adds a box around the str argument.
+    param: out - the writer, defaults to sys.stdout.
+    """
+    out = out or sys.stdout
+    if not total:
+        out.write(info_box_cb("No tasks found") + "\n")
+        return
+    shown = write_pages((get_task_cb("#", task) + "\n" for task in tasks), out)
+    if shown == 0:
+        out.write(f"No tasks to display. {total} tasks were found\n")
+    elif offset or shown < total:
+        footer = f"Showing tasks {offset + 1} to {offset + shown} of {total}."
+        if offset + shown < total:
+            footer += f" Add from:{offset + shown} to the search to see the next page."
+        out.write(footer + "\n")
+
+
+def view_task(task, out=None):
     """
     displays information about a single task assigned to the current logged in user.
     namely the task number, time remaining to complete and the task description.
     param: task - a task object.
+    param: out - the writer, defaults to sys.stdout.
     """
     info = task["task_info"]
     td = info["due_date"] - info["assigned_date"]
@@ -103,23 +277,19 @@ def view_task(task):
     task_str += "\n               ASSIGNED TASK"
     task_str += f"\n{info['description']}"
     task_str += "\n***********************************************\n"
-    print(task_str)
+    print(task_str, file=out)
 
 
-def view_stats(
-    read_task_overview_file_cb,
-    read_user_overview_file_cb,
-    info_box_cb,
-):
+def view_stats(task_stats, user_stats, info_box_cb, out=None):
     """
     displays all stats about tasks and users or a message if nothing to display.
-    param: read_task_overview_file_cb - function which returns the file contents.
-    param: read_user_overview_file_cb - function which returns the file contents.
+    param: task_stats - the task report or -1.
+    param: user_stats - the user report or -1.
+    param: info_box_cb - function which adds a box around the str argument.
+    param: out - the writer, defaults to sys.stdout.
     """
-    task_stats = read_task_overview_file_cb()
-    user_stats = read_user_overview_file_cb()
     if task_stats == -1 or user_stats == -1:
-        print(info_box_cb("No statistics to display. Type gr to generate reports"))
+        print(info_box_cb("No statistics to display. No tasks are available"), file=out)
     else:
-        print(task_stats)
-        print(user_stats)
+        print(task_stats, file=out)
+        print(user_stats, file=out)
@@ -0,0 +1,105 @@
+"""Write-behind saving of the user and task changes made in task_manager.py.
+Changes are grouped and saved together FLUSH_INTERVAL seconds after the first
+unsaved change, or straight away once FLUSH_SIZE tasks have unsaved changes,
+instead of only at logout. A crash loses at most the last few seconds of work.
+Storage that saves each change, like sqlite_access, is written straight away.
+file_access writes under a lock file and replaces whole files in one step, so
+a flush never leaves a half written file.
+"""
+
+import threading
+
+# seconds an unsaved change waits for other changes to be saved with it
+FLUSH_INTERVAL = 2.0
+# tasks with unsaved changes before they are saved without waiting
+FLUSH_SIZE = 100
+# a task changed twice before a flush is saved with the larger change
+CHANGE_PRIORITY = {"c": 0, "u": 1, "a": 2}
+
+
+class WriteBehind:
+    """
+    the unsaved users and tasks of the program.
+    the changes are made on the main thread and saved by a timer thread, so
+    everything is guarded by the lock. the user_list and task_list are never
+    changed in place, only replaced, so they are saved without being copied.
+    """
+
+    def __init__(
+        self, storage, task_list, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE
+    ):
+        """
+        param: storage - the storage backend module.
+        param: task_list - the task_list as loaded.
+        param: flush_interval - seconds before unsaved changes are saved.
+        param: flush_size - number of changed tasks which are saved straight away.
+        """
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.flush_size = 1 if storage.SAVE_EACH_CHANGE else flush_size
+        self.lock = threading.RLock()
+        self.user_list = None  # the user_list to save, or None if unchanged
+        self.task_list = None
+        # the task_list as last saved, which the stored records are checked against
+        self.saved_task_list = task_list
+        self.task_changes = {}  # index of each task changed since the last flush
+        self.timer = None
+        self.failed = False  # True if the last flush could not save everything
+
+    def track_users(self, user_list):
+        """
+        param: user_list - the changed user_list.
+        """
+        with self.lock:
+            self.user_list = user_list
+            self._schedule()
+
+    def track_tasks(self, task_list, task_changes):
+        """
+        param: task_list - the changed task_list.
+        param: task_changes - dict of task index to change type ("a", "u" or "c").
+        """
+        with self.lock:
+            self.task_list = task_list
+            for idx, change in task_changes.items():
+                prev_change = self.task_changes.get(idx, change)
+                self.task_changes[idx] = max(
+                    prev_change, change, key=CHANGE_PRIORITY.get
+                )
+            self._schedule()
+
+    def _schedule(self):
+        if len(self.task_changes) >= self.flush_size or self.flush_size == 1:
+            self.flush()
+        elif self.timer is None:
+            self.timer = threading.Timer(self.flush_interval, self.flush)
+            # a timer left at exit does not keep the program running
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """
+        saves the unsaved users and tasks, one write per file.
+        the journal is compacted once it is large enough.
+        changes that could not be written are kept for the next flush and failed is set.
+        returns: boolean - True if there was anything to save.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.user_list is None and not self.task_changes:
+                return False
+            if self.user_list is not None:
+                if self.storage.write_users_file(self.user_list):
+                    self.user_list = None
+            if self.task_changes:
+                if self.storage.append_tasks_journal(
+                    self.task_list, self.task_changes, self.saved_task_list
+                ):
+                    self.saved_task_list = self.task_list
+                    self.task_changes = {}
+                    if self.storage.tasks_journal_needs_compaction():
+                        self.storage.compact_tasks_file(self.task_list)
+            self.failed = self.user_list is not None or bool(self.task_changes)
+            return True